@@ -0,0 +1,190 @@
+# answer_cache.py
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from retrieval import STOPWORDS
+
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Kept in near-duplicate keys: "where" and "when" ask different things
+QUESTION_WORDS = frozenset("what when where which who whom whose why how".split())
+
+
+def normalize_question(question):
+    question = PUNCTUATION_PATTERN.sub(" ", question.lower())
+    return WHITESPACE_PATTERN.sub(" ", question).strip()
+
+
+def near_duplicate_key(question):
+    # Filler words rarely change the answer, so "What is the tuition fee?" and
+    # "what's tuition fee" share a key. Question words and word order are kept.
+    words = normalize_question(question).split()
+    return " ".join(w for w in words if w in QUESTION_WORDS or (w not in STOPWORDS and w != "s"))
+
+
+def file_fingerprint(path):
+    if not os.path.exists(path):
+        return ""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    def __init__(self, path, fingerprint, max_entries=1000, ttl_seconds=86400, fuzzy=True, save_interval=10.0):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fuzzy = fuzzy
+        self.save_interval = save_interval
+        self.autosave_pid = None
+        self.entries = OrderedDict()  # key -> (answer, created_at, near-duplicate key)
+        self.aliases = {}  # near-duplicate key -> key
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self._load()
+
+    def _ensure_autosave(self):
+        # Saves happen on a background thread, never inside a request. Started
+        # on first write in each process, so a forked worker gets its own.
+        pid = os.getpid()
+        if self.autosave_pid == pid:
+            return
+        self.autosave_pid = pid
+
+        def run():
+            while True:
+                time.sleep(self.save_interval)
+                self.flush()
+        threading.Thread(target=run, name="answer-cache-autosave", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _keys(self, question):
+        key = normalize_question(question)
+        alias = near_duplicate_key(question) if self.fuzzy else None
+        return key, alias
+
+    def get(self, question):
+        key, alias = self._keys(question)
+        now = time.time()
+        with self.lock:
+            if key not in self.entries and alias:
+                key = self.aliases.get(alias, key)
+            entry = self.entries.get(key)
+            if entry is None or now - entry[1] > self.ttl_seconds:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, question, answer):
+        key, alias = self._keys(question)
+        if not key:
+            return
+        with self.lock:
+            self.entries[key] = (answer, time.time(), alias)
+            self.entries.move_to_end(key)
+            if alias:
+                self.aliases[alias] = key
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+            self.dirty = True
+            self._ensure_autosave()
+
+    def invalidate(self, fingerprint):
+        with self.lock:
+            if fingerprint == self.fingerprint:
+                return
+            logging.info(f"Answer cache invalidated ({len(self.entries)} entries dropped).")
+            self.fingerprint = fingerprint
+            self.entries.clear()
+            self.aliases.clear()
+            self.dirty = True
+            self._ensure_autosave()
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry and entry[2] and self.aliases.get(entry[2]) == key:
+            del self.aliases[entry[2]]
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading answer cache {self.path}: {e}")
+            return
+        if stored.get("fingerprint") != self.fingerprint:
+            logging.info("Answer cache on disk is for an older document; starting empty.")
+            return
+        now = time.time()
+        for key, answer, created_at, alias in stored.get("entries", [])[-self.max_entries:]:
+            if now - created_at <= self.ttl_seconds:
+                self.entries[key] = (answer, created_at, alias)
+                if alias:
+                    self.aliases[alias] = key
+        logging.info(f"Loaded {len(self.entries)} cached answers from {self.path}.")
+
+    def flush(self):
+        # Snapshot under the lock, write without it so lookups never wait on disk
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                stored = {
+                    "fingerprint": self.fingerprint,
+                    "entries": [[key, *entry] for key, entry in self.entries.items()],
+                }
+                self.dirty = False
+            if not self._save(stored):
+                with self.lock:
+                    self.dirty = True
+
+    def _save(self, stored):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            logging.error(f"Error writing answer cache {self.path}: {e}")
+            return False
+
+    def warm_up(self, questions, answer_fn):
+        answered = 0
+        for question in questions:
+            if self.get(question) is not None:
+                continue
+            try:
+                self.put(question, answer_fn(question))
+                answered += 1
+            except Exception as e:
+                logging.error(f"Answer cache warm-up failed for {question!r}: {e}")
+        logging.info(f"Answer cache warm-up: {answered} of {len(questions)} questions answered.")
+
+
+def load_faq_questions(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip().endswith("?")]
@@ -0,0 +1,68 @@
+# batch_questions.py
+#
+# Runs a list of questions through answer_university_question concurrently,
+# e.g. the FAQ regression check after information.docx changes. Prints one
+# JSON report with each answer and its latency. Runs in-process by default,
+# or against a running server with --url (POST /admin/questions/batch).
+#
+#   python batch_questions.py [questions.txt] [--workers 8] [--url http://localhost:8000 --token ...]
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+
+from answer_cache import load_faq_questions
+
+
+def run_remote(url, token, questions, workers):
+    body = json.dumps({"questions": questions, "workers": workers}).encode("utf-8")
+    req = urllib.request.Request(
+        f"{url.rstrip('/')}/admin/questions/batch",
+        data=body,
+        headers={"Content-Type": "application/json", "X-Admin-Token": token},
+        method="POST",
+    )
+    with urllib.request.urlopen(req) as response:
+        return json.load(response)
+
+
+def run_local(questions, workers):
+    import main  # Loads the knowledge base and LLM configuration from the environment
+
+    started = time.perf_counter()
+    results, fingerprint = main.answer_questions_batch(questions, workers)
+    return {
+        "results": results,
+        "fingerprint": fingerprint,
+        "seconds": round(time.perf_counter() - started, 2),
+        "failed": sum(1 for r in results if "error" in r),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Answer a batch of university questions concurrently.")
+    parser.add_argument("questions", nargs="?", default="questionsToAns.txt",
+                        help="File with one question per line (lines ending in '?')")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--url", help="Base URL of a running server; in-process when omitted")
+    parser.add_argument("--token", default=os.getenv("ADMIN_API_TOKEN", ""), help="X-Admin-Token for --url")
+    args = parser.parse_args()
+
+    questions = load_faq_questions(args.questions)
+    if not questions:
+        sys.exit(f"No questions found in {args.questions}.")
+    if args.url:
+        report = run_remote(args.url, args.token, questions, args.workers)
+    else:
+        report = run_local(questions, args.workers)
+    latencies = sorted(r["latency_ms"] for r in report["results"])
+    report["max_latency_ms"] = latencies[-1] if latencies else None
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main_cli()
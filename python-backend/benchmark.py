@@ -0,0 +1,306 @@
+# benchmark.py
+#
+# Load test for /chat that needs neither Azure OpenAI nor MongoDB. The
+# module-level llm is replaced by a deterministic stand-in with configurable
+# latency and the registrations collection by mongomock (or a small in-memory
+# stand-in). Full registration conversations and question-mode traffic from
+# questionsToAns.txt are replayed concurrently through the Flask test client.
+#
+#   python benchmark.py --conversations 50 --questions 200 --concurrency 20 --latency-ms 300
+#   python benchmark.py --questions 0 --paste   # all details in the first message
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# main.py reads these at import; the benchmark never talks to Azure
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://benchmark.invalid")
+os.environ.setdefault("KNOWLEDGE_WATCH_INTERVAL", "0")
+
+from langchain.llms.base import LLM
+
+FIELD_NAMES = [
+    "Student Full Name", "Date of Birth", "Gender", "Nationality", "National ID", "Mobile Number",
+    "Email Address", "Parent/Guardian Name", "Parent/Guardian Contact Number",
+    "Parent/Guardian Email Address", "High School Name", "Graduation Year", "GPA", "Preferred Major/Program",
+]
+
+USER_INPUT_PATTERN = re.compile(r'User Input: "?(.*?)"?\n\n', re.DOTALL)
+LABELED_VALUE_PATTERN = re.compile(r"^[ \t]*([^:\n]+?)[ \t]*:[ \t]*(.+?)[ \t]*$", re.MULTILINE)
+
+
+def classify(user_input):
+    text = user_input.strip().lower()
+    if text.endswith("?"):
+        return "question"
+    if text.startswith(("edit ", "change ")):
+        return "edit"
+    return "field"
+
+
+def labeled_fields(user_input):
+    # "Field Name: value" lines, as in a pasted block of details
+    fields = {}
+    for label, value in LABELED_VALUE_PATTERN.findall(user_input):
+        for name in FIELD_NAMES:
+            if name.lower() == label.lower():
+                fields[name] = value
+    return fields
+
+
+def edit_target(user_input):
+    for name in FIELD_NAMES:
+        if name.lower() in user_input.lower():
+            return name
+    return "unknown"
+
+
+class FakeLLM(LLM):
+    # Answers each prompt type in main.py the way a well-behaved model would,
+    # after sleeping for `latency` seconds.
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "benchmark-fake"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        match = USER_INPUT_PATTERN.search(prompt)
+        user_input = match.group(1) if match else ""
+        if "Classify the user input" in prompt:
+            intent = classify(user_input)
+            fields = labeled_fields(user_input) if '"fields"' in prompt else {}
+            return json.dumps({
+                "intent": intent,
+                "value": None if fields else user_input if intent == "field" else None,
+                "field": edit_target(user_input) if intent == "edit" else None,
+                "fields": fields,
+            })
+        if "Determine whether" in prompt:
+            return classify(user_input)
+        if "extract only the" in prompt:
+            return user_input
+        if "determine which registration field" in prompt:
+            return edit_target(user_input)
+        return f"Benchmark answer ({len(prompt)} prompt chars)."
+
+
+class InMemoryCollection:
+    # Stand-in for the parts of a pymongo collection the app uses
+    name = "registrations"
+
+    def __init__(self):
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    def create_index(self, keys, **kwargs):
+        return kwargs.get("name", "_".join(k for k, _ in keys))
+
+    def bulk_write(self, operations, ordered=True):
+        with self.lock:
+            for op in operations:
+                # pymongo's UpdateOne keeps filter/update in private attributes
+                key = json.dumps(op._filter, sort_keys=True)
+                self.documents.setdefault(key, {}).update(op._doc["$set"])
+        return None
+
+
+def make_collection():
+    try:
+        import mongomock
+        return mongomock.MongoClient().benchmark.registrations
+    except ImportError:
+        return InMemoryCollection()
+
+
+# Free-text values vary per conversation so concurrent conversations never
+# render the same prompt and get merged by the dispatcher's single-flight
+FIRST_NAMES = ["Ahmed", "Omar", "Youssef", "Mariam", "Nour", "Salma", "Karim", "Hana", "Ali", "Laila"]
+FAMILY_NAMES = ["Mohamed", "Hassan", "Ibrahim", "Mahmoud", "Mostafa", "Khaled", "Said", "Farouk", "Adel", "Nabil"]
+SCHOOL_NAMES = ["Modern", "Future", "Nile", "Pioneers", "Horizon", "Delta", "Capital", "Crescent", "Oasis", "Lotus"]
+COUNTRIES = ["Egypt", "Canada", "China", "France", "Germany", "India", "United Kingdom", "United States"]
+MAJORS = ["Computer Science", "Data Science", "Software Engineering", "Electrical Engineering", "Civil Engineering",
+          "Mechanical Engineering", "Aerospace Engineering", "Biomedical Engineering", "Environmental Engineering",
+          "Robotics and Automation"]
+
+
+def one_of(values, n):
+    # Cycles through each value in lower, title and upper case before repeating
+    value = values[n % len(values)]
+    return (value.lower(), value, value.upper())[n // len(values) % 3]
+
+
+def person_name(n, offset=0):
+    n += offset
+    return f"{FIRST_NAMES[n % 10]} {FAMILY_NAMES[n // 10 % 10]} {FAMILY_NAMES[(n // 100 + 3) % 10]}{'' if n < 1000 else f' {FIRST_NAMES[n // 1000 % 10]}'}"
+
+
+def registration_script(n):
+    # One full conversation: every field, a question, a mid-flow edit and finalize
+    return [
+        person_name(n),
+        f"{n % 28 + 1:02d}/{n // 28 % 12 + 1:02d}/{2003 + n % 4}",
+        "male" if n % 2 else "female",
+        one_of(COUNTRIES, n),
+        f"What documents do I need to register for student number {n}?",
+        f"{30000000000000 + n}",
+        f"+20 12{n:08d}",
+        f"student{n}@example.com",
+        person_name(n, 500),
+        f"010{n:08d}",
+        f"parent{n}@example.com",
+        f"{SCHOOL_NAMES[n % 10]} High School No. {n}, Cairo",
+        f"{2020 + n % 5}",
+        f"{2 + (n % 200) / 100:.2f}",
+        "edit Email Address",
+        f"student{n}.new@example.com",
+        one_of(MAJORS, n),
+        "finalize",
+    ]
+
+
+def pasted_registration_script(n):
+    # Same conversation, but every detail arrives in the first message
+    script = registration_script(n)
+    values = script[:4] + script[5:14] + [script[16]]
+    details = "\n".join(f"{name}: {value}" for name, value in zip(FIELD_NAMES, values))
+    return [f"Here are my details:\n{details}", script[4], script[14], script[15], "finalize"]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+    }
+
+
+def run(args):
+    import main
+
+    main.llm = FakeLLM(latency=args.latency_ms / 1000)
+    # Logical calls are every call the code asked for, including those the
+    # dispatcher coalesced with an identical in-flight prompt; unlike the
+    # calls actually sent they do not depend on --concurrency
+    logical_calls = Counter()
+    logical_calls_lock = threading.Lock()
+    run_llm_chain = main.run_llm_chain
+
+    def counted_run_llm_chain(call_site, chain, inputs):
+        with logical_calls_lock:
+            logical_calls[call_site] += 1
+        return run_llm_chain(call_site, chain, inputs)
+
+    main.run_llm_chain = counted_run_llm_chain
+    main.registrations_collection = make_collection()
+    questions = main.load_faq_questions(main.FAQ_FILE) or ["Where is the university located?"]
+
+    latencies = {"registration": [], "question": []}
+    latencies_lock = threading.Lock()
+    completed = []
+
+    def post(client, payload):
+        started = time.perf_counter()
+        response = client.post("/chat", json=payload)
+        elapsed = time.perf_counter() - started
+        with latencies_lock:
+            latencies[payload["mode"]].append(elapsed)
+        return response
+
+    def conversation(n):
+        client = main.app.test_client()
+        session_id = f"benchmark-{n}"
+        answer = ""
+        script = pasted_registration_script(n) if args.paste else registration_script(n)
+        for message in script:
+            answer = post(client, {"question": message, "mode": "registration", "session_id": session_id}).get_json()["answer"]
+        if "saved" in answer:
+            completed.append(session_id)
+
+    def ask(n):
+        client = main.app.test_client()
+        post(client, {"question": questions[n % len(questions)], "mode": "question", "session_id": f"q-{n}"})
+
+    # Interleave the two kinds of traffic so both run under the same load
+    jobs = []
+    for n in range(max(args.conversations, args.questions)):
+        if n < args.conversations:
+            jobs.append((conversation, n))
+        if n < args.questions:
+            jobs.append((ask, n))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(fn, n) for fn, n in jobs]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    calls_by_site = {key[0]: value for key, value in main.LLM_CALLS.values.items()}
+    question_sites = ("answer_university_question", "stream_university_answer")
+    registration_calls = sum(v for site, v in logical_calls.items() if site not in question_sites)
+    registration_sent = sum(v for site, v in calls_by_site.items() if site not in question_sites)
+    report = {
+        "concurrency": args.concurrency,
+        "llm_latency_ms": args.latency_ms,
+        "seconds": round(elapsed, 2),
+        "overall": summarize(latencies["registration"] + latencies["question"], elapsed),
+        "registration": summarize(latencies["registration"], elapsed),
+        "question": summarize(latencies["question"], elapsed),
+        "completed_registrations": len(completed),
+        "llm_calls_per_registration": round(registration_calls / len(completed), 2) if completed else None,
+        "llm_calls_sent_per_registration": round(registration_sent / len(completed), 2) if completed else None,
+        "llm_calls_by_call_site": dict(logical_calls),
+        "llm_calls_sent_by_call_site": calls_by_site,
+        "llm_calls_coalesced": main.llm_dispatcher.metrics()["coalesced"],
+        "speculative_extractions": {key[0]: value for key, value in main.SPECULATIVE_EXTRACTIONS.values.items()},
+    }
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark /chat with a fake LLM and in-memory MongoDB.")
+    parser.add_argument("--conversations", type=int, default=20, help="Full registration conversations")
+    parser.add_argument("--questions", type=int, default=100, help="Question-mode requests")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=200, help="Simulated LLM latency per call")
+    parser.add_argument("--paste", action="store_true", help="Send all registration details in the first message")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the question answer cache enabled")
+    args = parser.parse_args()
+
+    # Isolate benchmark state from the real cache and session files
+    workdir = tempfile.mkdtemp(prefix="chat-benchmark-")
+    if not args.answer_cache:
+        os.environ["ANSWER_CACHE_ENABLED"] = "0"
+    os.environ.setdefault("ANSWER_CACHE_FILE", os.path.join(workdir, "answer_cache.json"))
+    os.environ.setdefault("REGISTRATION_SPILL_FILE", os.path.join(workdir, "pending_registrations.jsonl"))
+    os.environ.setdefault("SESSION_SQLITE_PATH", os.path.join(workdir, "sessions.db"))
+    # main.py resolves its data files relative to the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    report = run(args)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main_cli()
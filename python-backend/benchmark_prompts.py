@@ -0,0 +1,98 @@
+# benchmark_prompts.py
+#
+# Micro-benchmark of the per-turn CPU and allocation overhead around LLM
+# calls, comparing building templates/chains and compiling validator regexes
+# on every call (the old hot path) with the prompt registry and the compiled
+# validator table. No LLM is called; prompts are only rendered.
+#
+#   python benchmark_prompts.py [--iterations 2000]
+
+import argparse
+import json
+import re
+import sys
+import time
+import tracemalloc
+
+from benchmark import FakeLLM
+from langchain import PromptTemplate, LLMChain
+from prompts import PROMPT_TEMPLATES, PromptRegistry
+from registration_fields import data_fields
+
+# One registration turn with separate intent and extraction calls
+TURN_PROMPTS = [
+    ("determine_intent", {"current_field": "Mobile Number", "user_input": "my number is 0101 234 5678"}),
+    ("extract_clean_value", {"field_name": "Mobile Number", "user_input": "my number is 0101 234 5678"}),
+]
+TURN_VALUES = [("Mobile Number", "01012345678"), ("Email Address", "ahmed.ali@example.com")]
+
+LEGACY_PATTERNS = {
+    "Mobile Number": r'^\+?\d{10,15}$',
+    "Email Address": r'^[\w\.-]+@[\w\.-]+\.\w+$',
+}
+
+
+def rebuilt_prompts(llm):
+    for name, inputs in TURN_PROMPTS:
+        template, input_variables = PROMPT_TEMPLATES[name]
+        chain = LLMChain(prompt=PromptTemplate(template=template, input_variables=input_variables), llm=llm)
+        chain.prompt.format(**inputs)
+
+
+def registry_prompts(registry, llm):
+    for name, inputs in TURN_PROMPTS:
+        registry.chain(name, llm).prompt.format(**inputs)
+
+
+def recompiled_validators():
+    for field_name, value in TURN_VALUES:
+        # re.compile still goes through the re module's cache lookup on every call
+        re.compile(LEGACY_PATTERNS[field_name]).match(value)
+
+
+def table_validators():
+    for field_name, value in TURN_VALUES:
+        data_fields[field_name](value)
+
+
+def measure(fn, iterations):
+    fn()  # warm up caches and lazy imports
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    seconds = time.perf_counter() - started
+    samples = max(1, iterations // 10)
+    tracemalloc.start()
+    peak_total = 0
+    for _ in range(samples):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return {"us_per_turn": round(seconds / iterations * 1e6, 2), "peak_bytes_per_turn": peak_total // samples}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-turn prompt and validation overhead.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    llm = FakeLLM()
+    registry = PromptRegistry()
+    report = {
+        "prompts": {
+            "rebuilt_per_call": measure(lambda: rebuilt_prompts(llm), args.iterations),
+            "registry": measure(lambda: registry_prompts(registry, llm), args.iterations),
+        },
+        "validators": {
+            "recompiled_per_call": measure(recompiled_validators, args.iterations * 10),
+            "compiled_table": measure(table_validators, args.iterations * 10),
+        },
+    }
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# bulk_import.py
+#
+# Bulk registration import for school exports (CSV, JSONL or a JSON array).
+# Records are streamed through clean_field and the data_fields validators and
+# valid rows are upserted by National ID in unordered bulk writes; no LLM is
+# involved. Also usable from the command line:
+#
+#   python bulk_import.py registrations.csv [--dry-run] [--batch-size 1000]
+
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+
+from pymongo import MongoClient, UpdateOne
+
+from registration_fields import FIELD_NAME_MAPPING, clean_field, data_fields, data_fields_list
+from registration_writer import ensure_indexes
+
+# Column names seen in school exports that the chat synonyms do not cover
+IMPORT_HEADER_ALIASES = {
+    'student name': 'Student Full Name',
+    'name': 'Student Full Name',
+    "parent's name": 'Parent/Guardian Name',
+    "parent's contact": 'Parent/Guardian Contact Number',
+    "parent's email": 'Parent/Guardian Email Address',
+    'selected course': 'Preferred Major/Program',
+    'major': 'Preferred Major/Program',
+    'phone': 'Mobile Number',
+    'email address': 'Email Address',
+}
+
+SUPPORTED_FORMATS = ("csv", "jsonl", "json")
+
+
+def canonical_field(header):
+    key = " ".join(str(header).strip().lower().split())
+    if not key:
+        return None
+    for field_name in data_fields:
+        if field_name.lower() == key:
+            return field_name
+    return FIELD_NAME_MAPPING.get(key) or IMPORT_HEADER_ALIASES.get(key)
+
+
+def detect_format(filename, default="csv"):
+    name = (filename or "").lower()
+    for fmt in SUPPORTED_FORMATS:
+        if name.endswith(f".{fmt}"):
+            return fmt
+    if name.endswith(".ndjson"):
+        return "jsonl"
+    return default
+
+
+def iter_records(binary_stream, fmt):
+    # Yields (record_number, dict-or-error-string) without loading the whole file,
+    # except for JSON arrays which have to be parsed in one piece.
+    text = io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, row
+    elif fmt == "jsonl":
+        number = 0
+        for line in text:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, f"Invalid JSON: {e}"
+                continue
+            yield number, record if isinstance(record, dict) else "Record must be a JSON object."
+    elif fmt == "json":
+        records = json.load(text)
+        if not isinstance(records, list):
+            records = [records]
+        for number, record in enumerate(records, start=1):
+            yield number, record if isinstance(record, dict) else "Record must be a JSON object."
+    else:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(SUPPORTED_FORMATS)}.")
+
+
+def validate_record(record):
+    # Returns (clean_data, errors) where errors maps field name to message
+    values = {}
+    for header, raw in record.items():
+        field_name = canonical_field(header)
+        if field_name and raw is not None and str(raw).strip():
+            values[field_name] = str(raw).strip()
+
+    data, errors = {}, {}
+    for field_name, validator in data_fields_list:
+        raw = values.get(field_name)
+        if raw is None:
+            errors[field_name] = "Missing value."
+            continue
+        cleaned = clean_field(field_name, raw)
+        is_valid, error_msg = validator(cleaned)
+        if is_valid:
+            data[field_name] = cleaned
+        else:
+            errors[field_name] = error_msg
+    return data, errors
+
+
+def import_registrations(records, collection, batch_size=1000, on_error=None, dry_run=False):
+    summary = {"processed": 0, "valid": 0, "invalid": 0, "upserted": 0, "modified": 0, "batches": 0}
+    # Keyed by National ID so a student repeated within a batch is written once
+    batch = {}
+
+    def flush():
+        if not batch:
+            return
+        if not dry_run:
+            result = collection.bulk_write(
+                [UpdateOne({"National ID": national_id}, {"$set": data}, upsert=True)
+                 for national_id, data in batch.items()],
+                ordered=False,
+            )
+            summary["upserted"] += result.upserted_count
+            summary["modified"] += result.modified_count
+        summary["batches"] += 1
+        batch.clear()
+
+    for number, record in records:
+        summary["processed"] += 1
+        if isinstance(record, str):
+            data, errors = {}, {"record": record}
+        else:
+            data, errors = validate_record(record)
+        if errors:
+            summary["invalid"] += 1
+            if on_error is not None:
+                on_error(number, errors)
+            continue
+        summary["valid"] += 1
+        data["source"] = "bulk_import"
+        batch[data["National ID"]] = data
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import registrations from CSV/JSONL/JSON.")
+    parser.add_argument("path", help="File to import, or - for stdin")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Validate only, do not write to MongoDB")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="userDatabase")
+    parser.add_argument("--collection", default="registrations")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    collection = None if args.dry_run else MongoClient(args.mongo_uri)[args.db][args.collection]
+    if collection is not None:
+        # Every upsert filters on National ID; without the index each one scans the collection
+        ensure_indexes(collection)
+
+    def print_error(number, errors):
+        # One NDJSON line per rejected record keeps memory flat on large files
+        sys.stdout.write(json.dumps({"record": number, "errors": errors}) + "\n")
+
+    started = time.perf_counter()
+    if args.path == "-":
+        stream = sys.stdin.buffer
+    else:
+        stream = open(args.path, "rb")
+    with stream:
+        summary = import_registrations(
+            iter_records(stream, fmt), collection,
+            batch_size=args.batch_size, on_error=print_error, dry_run=args.dry_run,
+        )
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 3)
+    summary["records_per_second"] = round(summary["processed"] / elapsed) if elapsed else None
+    sys.stderr.write(json.dumps(summary) + "\n")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,94 @@
+# evaluate_intent_classifier.py
+#
+# Offline evaluation of intent_classifier.py against a labeled sample, for
+# choosing LOCAL_INTENT_THRESHOLD. Without --test, k-fold cross-validation
+# over the sample is used so no sample is scored by a model trained on it.
+# For each threshold the report shows how many turns would skip the LLM
+# (coverage) and how accurate those local decisions are.
+#
+#   python evaluate_intent_classifier.py [--samples intent_samples.tsv] [--test held_out.tsv] [--folds 5]
+
+import argparse
+import json
+import random
+import sys
+
+from intent_classifier import INTENTS, IntentClassifier, load_intent_samples
+
+DEFAULT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95)
+
+
+def cross_validated_predictions(samples, folds, seed):
+    shuffled = list(samples)
+    random.Random(seed).shuffle(shuffled)
+    predictions = []
+    for fold in range(folds):
+        train = [s for i, s in enumerate(shuffled) if i % folds != fold]
+        test = [s for i, s in enumerate(shuffled) if i % folds == fold]
+        classifier = IntentClassifier().fit(train)
+        predictions += [(text, label) + classifier.classify(text) for text, label in test]
+    return predictions
+
+
+def report(predictions, thresholds):
+    # predictions: [(text, label, predicted, confidence)]
+    total = len(predictions)
+    correct = sum(1 for _, label, predicted, _ in predictions if label == predicted)
+    per_intent = {}
+    for intent in INTENTS:
+        tp = sum(1 for _, label, predicted, _ in predictions if label == intent and predicted == intent)
+        labeled = sum(1 for _, label, _, _ in predictions if label == intent)
+        predicted_count = sum(1 for _, _, predicted, _ in predictions if predicted == intent)
+        per_intent[intent] = {
+            "support": labeled,
+            "precision": round(tp / predicted_count, 3) if predicted_count else None,
+            "recall": round(tp / labeled, 3) if labeled else None,
+        }
+    confusion = {label: {predicted: 0 for predicted in INTENTS} for label in INTENTS}
+    for _, label, predicted, _ in predictions:
+        confusion[label][predicted] += 1
+    by_threshold = []
+    for threshold in thresholds:
+        local = [(label, predicted) for _, label, predicted, confidence in predictions if confidence >= threshold]
+        local_correct = sum(1 for label, predicted in local if label == predicted)
+        by_threshold.append({
+            "threshold": threshold,
+            "coverage": round(len(local) / total, 3) if total else 0.0,
+            "accuracy": round(local_correct / len(local), 3) if local else None,
+            "errors": len(local) - local_correct,
+        })
+    mistakes = [
+        {"text": text, "label": label, "predicted": predicted, "confidence": round(confidence, 3)}
+        for text, label, predicted, confidence in predictions if label != predicted
+    ]
+    return {
+        "samples": total,
+        "accuracy": round(correct / total, 3) if total else None,
+        "per_intent": per_intent,
+        "confusion": confusion,
+        "by_threshold": by_threshold,
+        "mistakes": sorted(mistakes, key=lambda m: -m["confidence"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local intent classifier.")
+    parser.add_argument("--samples", default="intent_samples.tsv", help="Labeled training sample")
+    parser.add_argument("--test", help="Held-out labeled sample; defaults to cross-validation")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=DEFAULT_THRESHOLDS)
+    args = parser.parse_args()
+
+    samples = load_intent_samples(args.samples)
+    if args.test:
+        classifier = IntentClassifier().fit(samples)
+        predictions = [(text, label) + classifier.classify(text) for text, label in load_intent_samples(args.test)]
+    else:
+        predictions = cross_validated_predictions(samples, args.folds, args.seed)
+    json.dump(report(predictions, args.thresholds), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
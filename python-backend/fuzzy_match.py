@@ -0,0 +1,94 @@
+# fuzzy_match.py
+
+import re
+
+NON_ALNUM_PATTERN = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_term(value):
+    return NON_ALNUM_PATTERN.sub(" ", value.lower()).strip()
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    # Optimal string alignment distance: insertions, deletions, substitutions
+    # and adjacent transpositions ("sceince") each count as one edit
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+
+def token_similarity(term, alias, min_length):
+    # Compares word by word and returns the similarity of the worst differing
+    # word, so a shared word such as "engineering" cannot carry the score:
+    # "chemical engineering" is judged on "chemical" vs "mechanical" alone.
+    term_tokens, alias_tokens = term.split(), alias.split()
+    if len(term_tokens) != len(alias_tokens):
+        return 0.0
+    worst = 1.0
+    for a, b in zip(term_tokens, alias_tokens):
+        if a == b:
+            continue
+        if len(a) < min_length or len(b) < min_length:
+            return 0.0
+        worst = min(worst, 1 - edit_distance(a, b) / max(len(a), len(b)))
+    return worst
+
+
+class FuzzyIndex:
+    # Resolves free-text values to canonical names. Exact aliases are a dict
+    # lookup; misspellings go through a trigram inverted index so only aliases
+    # sharing trigrams with the input are scored, which keeps lookups fast as
+    # the alias list grows. A misspelling is accepted only if every word that
+    # differs is within `threshold` similarity of the alias word.
+    def __init__(self, aliases, threshold=0.8, min_fuzzy_length=4, max_candidates=5):
+        self.threshold = threshold
+        self.min_fuzzy_length = min_fuzzy_length
+        self.max_candidates = max_candidates
+        self.exact = {}
+        self.terms = []  # (normalized alias, canonical)
+        self.postings = {}  # trigram -> indexes into self.terms
+        for alias, canonical in aliases.items():
+            term = normalize_term(alias)
+            if not term or term in self.exact:
+                continue
+            self.exact[term] = canonical
+            self.terms.append((term, canonical))
+            for gram in trigrams(term):
+                self.postings.setdefault(gram, []).append(len(self.terms) - 1)
+
+    def lookup(self, value):
+        # Returns (canonical or None, confidence)
+        term = normalize_term(value)
+        if term in self.exact:
+            return self.exact[term], 1.0
+        # Short inputs such as "ce" are too close to other abbreviations to guess
+        if len(term) < self.min_fuzzy_length:
+            return None, 0.0
+        shared = {}
+        for gram in trigrams(term):
+            for i in self.postings.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:self.max_candidates]
+        best, best_score = None, 0.0
+        for i in candidates:
+            alias, canonical = self.terms[i]
+            if len(alias) < self.min_fuzzy_length:
+                continue
+            score = token_similarity(term, alias, self.min_fuzzy_length)
+            if score > best_score:
+                best, best_score = canonical, score
+        if best_score >= self.threshold:
+            return best, best_score
+        return None, best_score
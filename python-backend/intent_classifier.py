@@ -0,0 +1,158 @@
+# intent_classifier.py
+#
+# Local "field" / "question" / "edit" classifier for registration turns, so
+# obvious inputs skip the LLM. Unambiguous shapes are decided by rules; the
+# rest go through TF-IDF features and a softmax (multinomial logistic)
+# regression trained at startup on a small labeled sample. Pure Python, no
+# GPU or numerical libraries needed.
+
+import csv
+import logging
+import math
+import os
+import re
+
+INTENTS = ("field", "question", "edit")
+
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+|[?@/+]")
+EMAIL_PATTERN = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+PHONE_PATTERN = re.compile(r"^\+?\d[\d \-]{6,20}\d$")
+DATE_PATTERN = re.compile(r"^\d{1,2}[-/]\d{1,2}[-/]\d{4}$")
+NUMBER_PATTERN = re.compile(r"^\d+(?:\.\d+)?$")
+QUESTION_WORDS = {"what", "how", "why", "when", "where", "which", "who", "whom", "whose",
+                  "can", "could", "do", "does", "did", "is", "are", "should", "will", "would", "may"}
+EDIT_WORDS = {"edit", "change", "modify", "update", "correct", "fix"}
+
+
+def tokens(text):
+    # Digits are reduced to their length so "01012345678" and "01198765432" look alike
+    out = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        out.append(f"<num{min(len(token), 12)}>" if token.isdigit() else token)
+    return out
+
+
+def features(text):
+    words = tokens(text)
+    feats = list(words)
+    feats += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if words:
+        feats.append(f"__first_{words[0]}")
+        if words[0] in QUESTION_WORDS:
+            feats.append("__starts_with_question_word")
+    feats.append(f"__length_{min(len(words), 8)}")
+    if text.strip().endswith("?"):
+        feats.append("__ends_with_qmark")
+    return feats
+
+
+def rule_intent(text):
+    # Returns (intent, confidence) for inputs whose shape leaves no doubt, else None
+    stripped = text.strip()
+    lowered = stripped.lower()
+    if not stripped:
+        return None
+    if EMAIL_PATTERN.match(stripped) or DATE_PATTERN.match(stripped) or NUMBER_PATTERN.match(stripped) \
+            or PHONE_PATTERN.match(stripped):
+        return "field", 0.99
+    words = tokens(lowered)
+    if words and words[0] in EDIT_WORDS and "?" not in stripped:
+        return "edit", 0.95
+    # "Can I change my GPA?" is an edit request phrased as a question; left to the model
+    if stripped.endswith("?") and not EDIT_WORDS.intersection(words):
+        return "question", 0.97
+    return None
+
+
+class IntentClassifier:
+    def __init__(self, epochs=100, learning_rate=4.0, l2=1e-4):
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.idf = {}
+        self.weights = {intent: {} for intent in INTENTS}
+        self.bias = {intent: 0.0 for intent in INTENTS}
+
+    def vectorize(self, text):
+        counts = {}
+        for feat in features(text):
+            if feat in self.idf:
+                counts[feat] = counts.get(feat, 0) + 1
+        vector = {feat: (1 + math.log(count)) * self.idf[feat] for feat, count in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {feat: v / norm for feat, v in vector.items()}
+
+    def fit(self, samples):
+        # samples: [(text, intent)]
+        document_frequency = {}
+        for text, _ in samples:
+            for feat in set(features(text)):
+                document_frequency[feat] = document_frequency.get(feat, 0) + 1
+        n = len(samples)
+        self.idf = {feat: math.log((1 + n) / (1 + df)) + 1 for feat, df in document_frequency.items()}
+        vectors = [(self.vectorize(text), intent) for text, intent in samples]
+        self.weights = {intent: {} for intent in INTENTS}
+        self.bias = {intent: 0.0 for intent in INTENTS}
+        # Full-batch gradient descent on the softmax cross-entropy
+        for _ in range(self.epochs):
+            grad_w = {intent: {} for intent in INTENTS}
+            grad_b = {intent: 0.0 for intent in INTENTS}
+            for vector, label in vectors:
+                probs = self._probabilities(vector)
+                for intent in INTENTS:
+                    error = probs[intent] - (1.0 if intent == label else 0.0)
+                    grad_b[intent] += error
+                    g = grad_w[intent]
+                    for feat, value in vector.items():
+                        g[feat] = g.get(feat, 0.0) + error * value
+            step = self.learning_rate / max(n, 1)
+            for intent in INTENTS:
+                weights = self.weights[intent]
+                for feat in set(weights) | set(grad_w[intent]):
+                    w = weights.get(feat, 0.0)
+                    weights[feat] = w - step * grad_w[intent].get(feat, 0.0) - self.learning_rate * self.l2 * w
+                self.bias[intent] -= step * grad_b[intent]
+        return self
+
+    def _probabilities(self, vector):
+        scores = {
+            intent: self.bias[intent] + sum(self.weights[intent].get(feat, 0.0) * v for feat, v in vector.items())
+            for intent in INTENTS
+        }
+        top = max(scores.values())
+        exps = {intent: math.exp(score - top) for intent, score in scores.items()}
+        total = sum(exps.values())
+        return {intent: e / total for intent, e in exps.items()}
+
+    def classify(self, text):
+        # Returns (intent, confidence)
+        ruled = rule_intent(text)
+        if ruled is not None:
+            return ruled
+        probs = self._probabilities(self.vectorize(text))
+        intent = max(probs, key=probs.get)
+        return intent, probs[intent]
+
+
+def load_intent_samples(path):
+    # Tab-separated "intent<TAB>text" lines; blank lines and "#" comments are skipped
+    samples = []
+    if not os.path.exists(path):
+        logging.warning(f"{path} does not exist.")
+        return samples
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if not row or not row[0].strip() or row[0].startswith("#"):
+                continue
+            if len(row) < 2 or row[0] not in INTENTS:
+                logging.warning(f"Skipping malformed intent sample in {path}: {row}")
+                continue
+            samples.append((row[1], row[0]))
+    return samples
+
+
+def train_intent_classifier(path):
+    samples = load_intent_samples(path)
+    classifier = IntentClassifier().fit(samples)
+    logging.info(f"Trained intent classifier on {len(samples)} samples from {path}.")
+    return classifier
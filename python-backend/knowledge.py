@@ -0,0 +1,116 @@
+# knowledge.py
+
+import json
+import logging
+import os
+import re
+
+from answer_cache import file_fingerprint
+from registration_fields import mentioned_fields
+
+# Numbered headings in the registration guide, e.g. "7. National ID:"
+SECTION_HEADING_PATTERN = re.compile(r"^[ \t]*\d+\.[ \t]*(.+?):[ \t]*$", re.MULTILINE)
+
+
+class KnowledgeBase:
+    # Everything derived from the source files, built together so callers
+    # always see a consistent set. Instances are never mutated: a reload
+    # builds a new one and swaps the reference.
+    def __init__(self, university_information, university_fingerprint, university_index, registration_info,
+                 stamps=None):
+        self.university_information = university_information
+        self.university_fingerprint = university_fingerprint
+        self.university_index = university_index
+        self.registration_info = registration_info
+        self.registration_preamble, self.registration_sections = split_registration_sections(registration_info)
+        self.stamps = stamps or {}  # path -> (mtime_ns, size) the snapshot was built from
+
+    def registration_context(self, field_names):
+        # The general preamble plus the guidance for `field_names`; the whole
+        # guide when none of them has a section of its own
+        sections = [self.registration_sections[name] for name in field_names if name in self.registration_sections]
+        if not sections:
+            return self.registration_info
+        return "\n\n".join([self.registration_preamble] + sections).strip()
+
+
+def split_registration_sections(text):
+    # Returns (preamble, {canonical field name: section text}). Sections whose
+    # heading is not a registration field stay in the preamble.
+    headings = list(SECTION_HEADING_PATTERN.finditer(text))
+    if not headings:
+        return text.strip(), {}
+    preamble = [text[:headings[0].start()].strip()]
+    sections = {}
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        section = text[heading.start():end].strip()
+        fields = mentioned_fields(heading.group(1))
+        if fields and fields[0] not in sections:
+            sections[fields[0]] = section
+        else:
+            preamble.append(section)
+    return "\n\n".join(p for p in preamble if p), sections
+
+
+def source_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def read_docx_text(path):
+    from docx import Document  # For reading .docx files; imported only when parsing is needed
+    doc = Document(path)
+    return '\n'.join([para.text for para in doc.paragraphs])
+
+
+def load_document_text(path, cache_path):
+    # Returns (text, sha256). The parsed text is cached next to the source keyed
+    # by mtime/size, falling back to the content hash when only the mtime moved,
+    # so python-docx runs only when the file content actually changes.
+    if not os.path.exists(path):
+        logging.warning(f"{path} does not exist.")
+        return "", ""
+    stat = os.stat(path)
+    cached = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable cache {cache_path}: {e}")
+    if cached and cached.get("mtime") == stat.st_mtime and cached.get("size") == stat.st_size:
+        logging.info(f"Loaded {path} from parsed cache {cache_path}.")
+        return cached["text"], cached["sha256"]
+
+    sha256 = file_fingerprint(path)
+    if cached and cached.get("sha256") == sha256:
+        text = cached["text"]
+        logging.info(f"{path} was touched but not changed; reusing parsed cache.")
+    else:
+        try:
+            text = read_docx_text(path)
+            logging.info(f"Loaded university information from {path}.")
+        except Exception as e:
+            logging.error(f"Error reading {path}: {e}")
+            return "", sha256
+    try:
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"mtime": stat.st_mtime, "size": stat.st_size, "sha256": sha256, "text": text}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logging.warning(f"Error writing parsed cache {cache_path}: {e}")
+    return text, sha256
+
+
+def load_text_file(path):
+    if not os.path.exists(path):
+        logging.warning(f"{path} does not exist.")
+        return ""
+    with open(path, 'r', encoding='utf-8') as f:
+        logging.info(f"Loaded {path}.")
+        return f.read()
@@ -0,0 +1,135 @@
+# llm_dispatch.py
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Transport-level failures from openai/httpx that carry no status code
+RETRYABLE_ERROR_NAMES = {"APITimeoutError", "APIConnectionError", "Timeout", "TimeoutException",
+                         "ConnectError", "ReadTimeout", "ServiceUnavailableError"}
+
+
+class LLMBusyError(Exception):
+    # Raised instead of queueing without bound; callers answer 503 so clients back off
+    pass
+
+
+def error_status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(error):
+    status = error_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def retry_after_seconds(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMDispatcher:
+    # Single entry point for outbound LLM calls:
+    # - identical in-flight calls (same key) share one request;
+    # - at most `max_concurrency` calls run at once, at most `max_queue` wait
+    #   for a slot and anything beyond that fails fast with LLMBusyError;
+    # - 429/5xx/timeouts are retried with jittered exponential backoff.
+    # Per-call timeouts are enforced by the LLM client (request_timeout).
+    def __init__(self, max_concurrency=8, max_queue=64, queue_timeout=10.0,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.inflight = {}  # key -> Future shared by coalesced callers
+        self.waiting = 0
+        self.running = 0
+        self.stats = {"coalesced": 0, "retries": 0, "rejected": 0}
+
+    def call(self, key, fn):
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+        try:
+            result = self._call_with_retries(fn)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    @contextmanager
+    def slot(self):
+        with self.lock:
+            if self.waiting >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise LLMBusyError("Too many LLM calls waiting.")
+            self.waiting += 1
+        try:
+            acquired = self.slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+        if not acquired:
+            with self.lock:
+                self.stats["rejected"] += 1
+            raise LLMBusyError("Timed out waiting for an LLM slot.")
+        with self.lock:
+            self.running += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.running -= 1
+            self.slots.release()
+
+    def _call_with_retries(self, fn):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.slot():
+                    return fn()
+            except LLMBusyError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                # The slot is released while backing off so other calls can proceed
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                delay = random.uniform(delay / 2, delay)
+                # A server Retry-After is honoured up to backoff_max so one call
+                # cannot hold its request thread for minutes
+                delay = min(self.backoff_max, max(delay, retry_after_seconds(e) or 0.0))
+                with self.lock:
+                    self.stats["retries"] += 1
+                logging.warning(f"LLM call failed ({type(e).__name__}, attempt {attempt + 1}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    def metrics(self):
+        with self.lock:
+            return {"running": self.running, "waiting": self.waiting, **self.stats}
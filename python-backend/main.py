@@ -1,15 +1,41 @@
 # main.py
 
+import time
+import_started = time.perf_counter()
+
 import os
 import re
+import atexit
+import hmac
+import json
 import logging
-from datetime import datetime
-from flask import Flask, request, jsonify
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from langchain.chat_models import AzureChatOpenAI
-from langchain import PromptTemplate, LLMChain
-from docx import Document  # For reading .docx files
+from retrieval import BM25Index
+from knowledge import KnowledgeBase, load_document_text, load_text_file, source_stamp
+from answer_cache import AnswerCache, load_faq_questions
+from session_store import create_session_store
+from registration_writer import RegistrationWriter, ensure_indexes
+from metrics import MetricsRegistry
+from intent_classifier import train_intent_classifier
+from prompts import PromptRegistry, TURN_FIELDS_SCHEMA
+from llm_dispatch import LLMBusyError, LLMDispatcher
+from langchain.callbacks import get_openai_callback
+from bulk_import import canonical_field, detect_format, import_registrations, iter_records
+from registration_reports import DEFAULT_EXPORT_FIELDS, EXPORT_FORMATS, CachedValue, iter_export, registration_stats
+from registration_fields import (
+    FIELD_NAME_MAPPING,
+    GENDER_MAP,
+    data_fields,
+    data_fields_list,
+    clean_field,
+    mentioned_fields,
+)
+imports_done = time.perf_counter()
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
@@ -32,292 +58,540 @@ os.environ["AZURE_OPENAI_API_KEY"] = OPENAI_API_KEY
 os.environ["AZURE_OPENAI_ENDPOINT"] = OPENAI_API_BASE
 os.environ["OPENAI_API_TYPE"] = OPENAI_API_TYPE
 
-# Initialize LangChain LLM
-llm = AzureChatOpenAI(
-    openai_api_version=api_version,
-    azure_deployment=deployment_name,
-)
-
 # MongoDB Setup
 MONGO_URI = "mongodb://localhost:27017"
 DB_NAME = "userDatabase"
 REG_COLLECTION_NAME = "registrations"
 
-mongo_client = MongoClient(MONGO_URI)
-db = mongo_client[DB_NAME]
-registrations_collection = db[REG_COLLECTION_NAME]
+# Retrieval settings for question mode (RETRIEVAL_TOP_K=0 sends the whole document)
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+RETRIEVAL_CHUNK_SIZE = int(os.getenv("RETRIEVAL_CHUNK_SIZE", "200"))
+RETRIEVAL_CHUNK_OVERLAP = int(os.getenv("RETRIEVAL_CHUNK_OVERLAP", "40"))
+# Share of question terms that must be found in the document before only the matching chunks are sent
+RETRIEVAL_MIN_COVERAGE = float(os.getenv("RETRIEVAL_MIN_COVERAGE", "0.5"))
+
+# Question-mode answer cache (persisted to disk, invalidated when the docx changes)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_FILE = os.getenv("ANSWER_CACHE_FILE", "answer_cache.json")
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_FUZZY = os.getenv("ANSWER_CACHE_FUZZY", "1") == "1"
+ANSWER_CACHE_WARMUP = os.getenv("ANSWER_CACHE_WARMUP", "0") == "1"
+# Seconds between background saves of new answers (also saved at exit)
+ANSWER_CACHE_SAVE_INTERVAL = float(os.getenv("ANSWER_CACHE_SAVE_INTERVAL", "10"))
+
+# Classify intent, extract the value and the edit target in one LLM call per registration turn
+COMBINED_TURN_CALL = os.getenv("COMBINED_TURN_CALL", "1") == "1"
+# Store every registration field found in a message, not only the one being asked for.
+# The values come from the combined turn call, so this needs COMBINED_TURN_CALL.
+MULTI_FIELD_EXTRACTION = os.getenv("MULTI_FIELD_EXTRACTION", "1") == "1"
+# With separate intent/extraction calls (COMBINED_TURN_CALL=0), start the value
+# extraction alongside determine_intent and drop it if the input was not a value
+SPECULATIVE_EXTRACTION = os.getenv("SPECULATIVE_EXTRACTION", "0") == "1"
+SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "16"))
+
+# Local intent classifier: the LLM is only asked when its confidence is below the
+# threshold (tune with evaluate_intent_classifier.py)
+LOCAL_INTENT_CLASSIFIER = os.getenv("LOCAL_INTENT_CLASSIFIER", "1") == "1"
+LOCAL_INTENT_THRESHOLD = float(os.getenv("LOCAL_INTENT_THRESHOLD", "0.8"))
+
+# Registration session storage: "memory" (per process) or "sqlite" (shared by all workers on the host)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+
+# Finalized registrations are written behind the request in batched bulk upserts
+REGISTRATION_WRITE_BATCH_SIZE = int(os.getenv("REGISTRATION_WRITE_BATCH_SIZE", "100"))
+REGISTRATION_WRITE_FLUSH_INTERVAL = float(os.getenv("REGISTRATION_WRITE_FLUSH_INTERVAL", "0.5"))
+REGISTRATION_WRITE_MAX_RETRIES = int(os.getenv("REGISTRATION_WRITE_MAX_RETRIES", "3"))
+REGISTRATION_SPILL_FILE = os.getenv("REGISTRATION_SPILL_FILE", "pending_registrations.jsonl")
+
+# The LLM, MongoDB and knowledge files are initialized on first use; LAZY_INIT=0 loads the
+# knowledge files, intent classifier and LLM chains at import (MongoDB stays per process)
+LAZY_INIT = os.getenv("LAZY_INIT", "1") == "1"
 
 # Load external information
 INFORMATION_FILE = "information.docx"  # Changed to .docx
+INFORMATION_CACHE_FILE = os.getenv("INFORMATION_CACHE_FILE", "information.parsed.json")
 REGISTRATION_INFO_FILE = "registration_fields_info_with_national_id.txt"
+FAQ_FILE = "questionsToAns.txt"
+INTENT_SAMPLES_FILE = os.getenv("INTENT_SAMPLES_FILE", "intent_samples.tsv")
+
+# Seconds between checks for changed knowledge files (0 disables the watcher; POST /admin/reload-knowledge still works)
+KNOWLEDGE_WATCH_INTERVAL = float(os.getenv("KNOWLEDGE_WATCH_INTERVAL", "30"))
+
+# Bulk registration import (POST /admin/registrations/import)
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+# LLM dispatch: concurrent calls, callers allowed to wait for a slot, retries on 429/5xx
+# (sized for the threaded server; serve.py raises the defaults for gevent)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+# Admin export/stats (GET /admin/registrations/export, /admin/registrations/stats)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "60"))
+
+# Batch question answering (POST /admin/questions/batch, batch_questions.py);
+# BATCH_MAX_WORKERS caps the endpoint, batch_questions.py --workers is used as given
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+
+# Shared secret for /admin endpoints, sent as the X-Admin-Token header (unset disables them)
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+########################
+# Lazy Resource Loading
+########################
+startup_timings = {"imports": (imports_done - import_started) * 1000}
+
+@contextmanager
+def startup_step(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = (time.perf_counter() - started) * 1000
+        logging.info(f"Startup: {name} took {startup_timings[name]:.1f} ms")
+
+# Assigning these directly (e.g. a stand-in LLM in benchmarks) bypasses lazy creation
+llm = None
+mongo_client = None
+registrations_collection = None
+registration_writer = None
+knowledge = None
+intent_classifier = None
+
+llm_lock = threading.Lock()
+mongo_lock = threading.Lock()
+knowledge_lock = threading.Lock()
+intent_classifier_lock = threading.Lock()
+
+def get_llm():
+    global llm
+    if llm is None:
+        with llm_lock:
+            if llm is None:
+                with startup_step("llm"):
+                    # Importing langchain.chat_models pulls in every provider, so it is deferred too
+                    from langchain.chat_models import AzureChatOpenAI
+                    llm = AzureChatOpenAI(
+                        openai_api_version=api_version,
+                        azure_deployment=deployment_name,
+                        request_timeout=LLM_TIMEOUT,
+                        # Retries are done by llm_dispatcher, which frees the slot while backing off
+                        max_retries=0,
+                    )
+    return llm
+
+# Prompt templates are parsed once; chains are built once per LLM instance
+prompt_registry = PromptRegistry()
+
+def llm_chain(name):
+    return prompt_registry.chain(name, get_llm())
+
+def get_registrations_collection():
+    global mongo_client, registrations_collection
+    if registrations_collection is None:
+        with mongo_lock:
+            if registrations_collection is None:
+                with startup_step("mongo"):
+                    mongo_client = MongoClient(MONGO_URI)
+                    collection = mongo_client[DB_NAME][REG_COLLECTION_NAME]
+                    # Once per worker, before any finalization, import, export or stats query
+                    ensure_indexes(collection)
+                    registrations_collection = collection
+    return registrations_collection
+
+def get_registration_writer():
+    global registration_writer
+    if registration_writer is None:
+        collection = get_registrations_collection()
+        with mongo_lock:
+            if registration_writer is None:
+                writer = RegistrationWriter(
+                    collection,
+                    REGISTRATION_SPILL_FILE,
+                    batch_size=REGISTRATION_WRITE_BATCH_SIZE,
+                    flush_interval=REGISTRATION_WRITE_FLUSH_INTERVAL,
+                    max_retries=REGISTRATION_WRITE_MAX_RETRIES,
+                )
+                writer.start()
+                atexit.register(writer.close)
+                registration_writer = writer
+    return registration_writer
+
+def get_intent_classifier():
+    global intent_classifier
+    if intent_classifier is None and LOCAL_INTENT_CLASSIFIER:
+        with intent_classifier_lock:
+            if intent_classifier is None:
+                with startup_step("intent_classifier"):
+                    intent_classifier = train_intent_classifier(INTENT_SAMPLES_FILE)
+    return intent_classifier
+
+def load_knowledge(previous=None):
+    # Only sources whose stamp changed since `previous` are re-read; the rest
+    # of the derived state is carried over as is.
+    stamps = {path: source_stamp(path) for path in (INFORMATION_FILE, REGISTRATION_INFO_FILE)}
+    if previous is not None and previous.stamps.get(INFORMATION_FILE) == stamps[INFORMATION_FILE]:
+        university_information = previous.university_information
+        fingerprint = previous.university_fingerprint
+        university_index = previous.university_index
+    else:
+        with startup_step("information_docx"):
+            university_information, fingerprint = load_document_text(INFORMATION_FILE, INFORMATION_CACHE_FILE)
+        with startup_step("retrieval_index"):
+            # Index the document once so each question only sends the relevant chunks
+            university_index = BM25Index.from_text(university_information, RETRIEVAL_CHUNK_SIZE, RETRIEVAL_CHUNK_OVERLAP)
+            logging.info(f"Indexed {INFORMATION_FILE} into {len(university_index.chunks)} chunks.")
+    if previous is not None and previous.stamps.get(REGISTRATION_INFO_FILE) == stamps[REGISTRATION_INFO_FILE]:
+        registration_info = previous.registration_info
+    else:
+        with startup_step("registration_info"):
+            registration_info = load_text_file(REGISTRATION_INFO_FILE)
+    return KnowledgeBase(university_information, fingerprint, university_index, registration_info, stamps)
+
+def get_knowledge():
+    global knowledge
+    if knowledge is None:
+        with knowledge_lock:
+            if knowledge is None:
+                knowledge = load_knowledge()
+    return knowledge
+
+def reload_knowledge():
+    # Requests keep using the snapshot they already hold; the new one is built
+    # off to the side and published with a single reference assignment.
+    global knowledge
+    with knowledge_lock:
+        previous = knowledge
+        if previous is None:
+            return []
+        changed = [path for path, stamp in previous.stamps.items() if source_stamp(path) != stamp]
+        if not changed:
+            return []
+        logging.info(f"Reloading knowledge base; changed: {', '.join(changed)}")
+        knowledge = load_knowledge(previous)
+    if answer_cache is not None:
+        answer_cache.invalidate(knowledge.university_fingerprint)
+    return changed
+
+def watch_knowledge_files():
+    while True:
+        time.sleep(KNOWLEDGE_WATCH_INTERVAL)
+        try:
+            reload_knowledge()
+        except Exception as e:
+            logging.error(f"Knowledge reload failed: {e}")
+
+##########
+# Metrics
+##########
+metrics = MetricsRegistry()
+LLM_CALLS = metrics.counter("llm_calls_total", "LLM calls by call site.", ["call_site"])
+LLM_ERRORS = metrics.counter("llm_errors_total", "Failed LLM calls by call site and exception type.", ["call_site", "error"])
+LLM_LATENCY = metrics.histogram("llm_call_seconds", "LLM call latency by call site.", ["call_site"])
+LLM_TIME_TO_FIRST_TOKEN = metrics.histogram("llm_time_to_first_token_seconds", "Time to the first streamed fragment.", ["call_site"])
+LLM_TOKENS = metrics.counter("llm_tokens_total", "Tokens reported by the model by call site and kind (prompt/completion).", ["call_site", "kind"])
+CHAT_REQUESTS = metrics.counter("chat_requests_total", "/chat requests by mode (question_stream for SSE) and status code.", ["mode", "status"])
+CHAT_LATENCY = metrics.histogram("chat_request_seconds", "/chat request latency by mode; *_stream modes run to the end of the stream.", ["mode"])
+LOCAL_INTENT_DECISIONS = metrics.counter("local_intent_decisions_total", "Registration turns classified locally or deferred to the LLM, by local intent.", ["decision", "intent"])
+SPECULATIVE_EXTRACTIONS = metrics.counter("speculative_extractions_total", "Value extractions run alongside intent classification by outcome (used/wasted).", ["outcome"])
+FIELD_EXTRACTIONS = metrics.counter("field_extractions_total", "Registration value extractions by path (fast_path/combined_call/llm_fallback).", ["path"])
+
+llm_dispatcher = LLMDispatcher(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    max_queue=LLM_MAX_QUEUE,
+    queue_timeout=LLM_QUEUE_TIMEOUT,
+    max_retries=LLM_MAX_RETRIES,
+)
+
+def run_llm_chain(call_site, chain, inputs):
+    # Every LLM call goes through the dispatcher; concurrent requests that
+    # render the same prompt share a single call.
+    key = (call_site, chain.prompt.format(**inputs))
+    return llm_dispatcher.call(key, lambda: invoke_llm_chain(call_site, chain, inputs))
 
-if os.path.exists(INFORMATION_FILE):
+def invoke_llm_chain(call_site, chain, inputs):
+    # One attempt; latency, tokens and errors are recorded per call site
+    started = time.perf_counter()
     try:
-        doc = Document(INFORMATION_FILE)
-        university_information = '\n'.join([para.text for para in doc.paragraphs])
-        logging.info(f"Loaded university information from {INFORMATION_FILE}.")
+        with get_openai_callback() as usage:
+            result = chain.run(inputs)
     except Exception as e:
-        logging.error(f"Error reading {INFORMATION_FILE}: {e}")
-        university_information = ""
-else:
-    logging.warning(f"{INFORMATION_FILE} does not exist.")
-    university_information = ""
-
-if os.path.exists(REGISTRATION_INFO_FILE):
-    with open(REGISTRATION_INFO_FILE, 'r', encoding='utf-8') as f:
-        registration_info = f.read()
-        logging.info(f"Loaded registration info from {REGISTRATION_INFO_FILE}.")
-else:
-    logging.warning(f"{REGISTRATION_INFO_FILE} does not exist.")
-    registration_info = ""
+        LLM_ERRORS.inc(call_site=call_site, error=type(e).__name__)
+        raise
+    finally:
+        LLM_CALLS.inc(call_site=call_site)
+        LLM_LATENCY.observe(time.perf_counter() - started, call_site=call_site)
+    LLM_TOKENS.inc(usage.prompt_tokens, call_site=call_site, kind="prompt")
+    LLM_TOKENS.inc(usage.completion_tokens, call_site=call_site, kind="completion")
+    return result
 
 #######################
 # GLOBAL STATE TRACKING
 #######################
-sessions = {}
-# Field name mapping from synonyms to canonical field names
-FIELD_NAME_MAPPING = {
-    'student full name': 'Student Full Name',
-    'full name': 'Student Full Name',
-    'dob': 'Date of Birth',
-    'date of birth': 'Date of Birth',
-    'gender': 'Gender',
-    'nationality': 'Nationality',
-    'national id': 'National ID',
-    'id number': 'National ID',
-    'id': 'National ID',
-    'mobile': 'Mobile Number',
-    'mobile number': 'Mobile Number',
-    'email': 'Email Address',
-    'parent name': 'Parent/Guardian Name',
-    'guardian name': 'Parent/Guardian Name',
-    'parent/guardian name': 'Parent/Guardian Name',
-    'parent contact': 'Parent/Guardian Contact Number',
-    'guardian contact': 'Parent/Guardian Contact Number',
-    'parent/guardian contact': 'Parent/Guardian Contact Number',
-    'parent email': 'Parent/Guardian Email Address',
-    'guardian email': 'Parent/Guardian Email Address',
-    'parent/guardian email': 'Parent/Guardian Email Address',
-    'high school': 'High School Name',
-    'graduation year': 'Graduation Year',
-    'gpa': 'GPA',
-    'preferred major': 'Preferred Major/Program',
-    'preferred program': 'Preferred Major/Program',
-}
+session_store = create_session_store(SESSION_STORE, SESSION_MAX_SESSIONS, SESSION_TTL, SESSION_SQLITE_PATH)
 
-GENDER_MAP = {
-    'male': 'Male',
-    'm': 'Male',
-    'female': 'Female',
-    'f': 'Female',
-}
-
-PREFERRED_MAJOR_MAP = {
-    'cs': 'Computer Science',
-    'computer science': 'Computer Science',
-    'electrical engineering': 'Electrical Engineering',
-    'ee': 'Electrical Engineering',
-    'mechanical engineering': 'Mechanical Engineering',
-    'me': 'Mechanical Engineering',
-    'civil engineering': 'Civil Engineering',
-    'ce': 'Civil Engineering',
-    'aerospace engineering': 'Aerospace Engineering',
-    'ae': 'Aerospace Engineering',
-    'biomedical engineering': 'Biomedical Engineering',
-    'be': 'Biomedical Engineering',
-    'software engineering': 'Software Engineering',
-    'se': 'Software Engineering',
-    'environmental engineering': 'Environmental Engineering',
-    'enve': 'Environmental Engineering',
-    'robotics and automation': 'Robotics and Automation',
-    'ra': 'Robotics and Automation',
-    'data science': 'Data Science',
-    'ds': 'Data Science',
+###########################
+# Deterministic Extraction
+###########################
+EMAIL_SEARCH_PATTERN = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+NATIONAL_ID_SEARCH_PATTERN = re.compile(r"(?<!\d)\d{14}(?!\d)")
+MOBILE_SEARCH_PATTERN = re.compile(r"(?<![\w+])\+?\d[\d \-]{8,20}\d(?!\d)")
+DATE_SEARCH_PATTERN = re.compile(r"(?<!\d)\d{1,2}[-/]\d{1,2}[-/]\d{4}(?!\d)")
+YEAR_SEARCH_PATTERN = re.compile(r"(?<![\d.])\d{4}(?![\d.])")
+NUMBER_SEARCH_PATTERN = re.compile(r"(?<![\d.])\d+(?:\.\d+)?(?![\d.])")
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+def _single_match(pattern, user_input, normalize=lambda v: v):
+    # Only a single distinct candidate is trusted; anything else is ambiguous
+    candidates = {normalize(m) for m in pattern.findall(user_input)}
+    return candidates.pop() if len(candidates) == 1 else None
+
+def _extract_mobile(user_input):
+    return _single_match(MOBILE_SEARCH_PATTERN, user_input, lambda v: re.sub(r"[ \-]", "", v))
+
+def _extract_gender(user_input):
+    words = WORD_PATTERN.findall(user_input.lower())
+    full_words = {GENDER_MAP[w] for w in words if w in ("male", "female")}
+    if len(full_words) == 1:
+        return full_words.pop()
+    if len(words) == 1 and words[0] in GENDER_MAP:
+        return GENDER_MAP[words[0]]
+    return None
+
+FAST_EXTRACTORS = {
+    "Date of Birth": lambda x: _single_match(DATE_SEARCH_PATTERN, x),
+    "Gender": _extract_gender,
+    "National ID": lambda x: _single_match(NATIONAL_ID_SEARCH_PATTERN, x),
+    "Mobile Number": _extract_mobile,
+    "Email Address": lambda x: _single_match(EMAIL_SEARCH_PATTERN, x),
+    "Parent/Guardian Contact Number": _extract_mobile,
+    "Parent/Guardian Email Address": lambda x: _single_match(EMAIL_SEARCH_PATTERN, x),
+    "Graduation Year": lambda x: _single_match(YEAR_SEARCH_PATTERN, x),
+    "GPA": lambda x: _single_match(NUMBER_SEARCH_PATTERN, x),
 }
 
-VALID_COUNTRIES = {
-    'Egypt': ['egypt', 'egyptian'],
-    'United States': ['united states', 'usa', 'us', 'america', 'american'],
-    'Canada': ['canada', 'canadian'],
-    'United Kingdom': ['united kingdom', 'uk', 'britain', 'british'],
-    'France': ['france', 'french'],
-    'Germany': ['germany', 'german'],
-    'India': ['india', 'indian'],
-    'China': ['china', 'chinese'],
-}
-
-data_fields_list = [
-    ("Student Full Name", lambda x: (len(x.strip().split()) >= 3, "Full name must contain at least three names.")),
-    ("Date of Birth", lambda x: validate_date_of_birth(x)),
-    ("Gender", lambda x: validate_gender(x)),
-    ("Nationality", lambda x: validate_nationality(x)),
-    ("National ID", lambda x: validate_national_id(x)),
-    ("Mobile Number", lambda x: validate_mobile_number(x)),
-    ("Email Address", lambda x: validate_email(x)),
-    ("Parent/Guardian Name", lambda x: (len(x.strip().split()) >= 3, "Full name must contain at least three names.")),
-    ("Parent/Guardian Contact Number", lambda x: validate_mobile_number(x)),
-    ("Parent/Guardian Email Address", lambda x: validate_email(x)),
-    ("High School Name", lambda x: (True, "")),
-    ("Graduation Year", lambda x: validate_graduation_year(x)),
-    ("GPA", lambda x: validate_gpa(x)),
-    ("Preferred Major/Program", lambda x: validate_preferred_major(x))
-]
-
-# Make a dict for easy lookup
-data_fields = {f[0]: f[1] for f in data_fields_list}
-
-##############
-# Validations
-##############
-def validate_date_of_birth(dob):
-    for fmt in ("%d-%m-%Y", "%d/%m/%Y"):
-        try:
-            datetime.strptime(dob, fmt)
-            return True, ""
-        except ValueError:
-            continue
-    return False, "Date of Birth must be in the format DD-MM-YYYY or DD/MM/YYYY."
-
-def validate_gender(gender):
-    g = gender.lower()
-    if g in GENDER_MAP:
-        return True, ""
-    return False, "Gender must be Male or Female (M/F accepted)."
-
-def validate_nationality(nationality):
-    if nationality in VALID_COUNTRIES:
-        return True, ""
-    return False, f"Nationality '{nationality}' is not recognized."
-
-def validate_national_id(national_id):
-    if re.fullmatch(r"\d{14}", national_id):
-        return True, ""
-    return False, "National ID must be exactly 14 digits."
-
-def validate_mobile_number(mobile):
-    pattern = re.compile(r'^\+?\d{10,15}$')
-    if pattern.match(mobile):
-        return True, ""
-    return False, "Mobile number should be 10 to 15 digits (with optional +)."
-
-def validate_email(email):
-    pattern = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
-    if pattern.match(email):
-        return True, ""
-    return False, "Email address not valid."
-
-def validate_graduation_year(year):
-    if re.fullmatch(r"\d{4}", year):
-        y = int(year)
-        if 1900 <= y <= 2100:
-            return True, ""
-    return False, "Graduation year must be between 1900 and 2100."
-
-def validate_gpa(gpa):
-    try:
-        val = float(gpa)
-        if 0.0 <= val <= 4.0:
-            return True, ""
-    except:
-        pass
-    return False, "GPA must be 0.0 to 4.0."
-
-def validate_preferred_major(major):
-    if major in PREFERRED_MAJOR_MAP.values():
-        return True, ""
-    return False, f"Preferred Major not recognized."
-
-##############
-# Cleaning
-##############
-def map_gender(g):
-    return GENDER_MAP.get(g.lower(), g)
-
-def map_nationality_to_country(nat):
-    nat_lower = nat.lower()
-    for country, variations in VALID_COUNTRIES.items():
-        if nat_lower in variations:
-            return country
-    return nat.capitalize()
-
-def map_preferred_major(m):
-    m_lower = m.lower()
-    return PREFERRED_MAJOR_MAP.get(m_lower, m.title())
-
-def clean_field(field_name, value):
-    if field_name == "Gender":
-        return map_gender(value)
-    if field_name == "Nationality":
-        return map_nationality_to_country(value)
-    if field_name == "Preferred Major/Program":
-        return map_preferred_major(value)
-    if field_name == "National ID":
-        digits = re.findall(r"\d+", value)
-        return digits[0] if digits else value
-    return value
+def fast_extract_value(field_name, user_input):
+    extractor = FAST_EXTRACTORS.get(field_name)
+    if extractor is None:
+        return None
+    value = extractor(user_input)
+    if value is None:
+        return None
+    # The local result must pass the same validation the LLM result would
+    is_valid, _ = data_fields[field_name](clean_field(field_name, value))
+    return value if is_valid else None
 
 ###########################
 # LLM-based Data Extraction
 ###########################
-def extract_clean_value(field_name, user_input):
-    template = f"""
-You are a helpful assistant. The user is being asked to provide their {field_name} for a registration form.
-They may include additional text, but you must extract only the {field_name} from their message.
-If you cannot find a clear {field_name}, respond with "No data".
-
-Field: {field_name}
-User Input: {user_input}
-
-Please return only the exact {field_name} with no additional text, no explanations, and no formatting other than the value itself.
-"""
-    prompt = PromptTemplate(input_variables=[], template=template)
-    llm_chain_extraction = LLMChain(prompt=prompt, llm=llm)
-    extracted = llm_chain_extraction.run({})
+def extract_clean_value(field_name, user_input, proposed_value=None, speculative=False):
+    # Speculative extractions are counted by the caller, only once they are used
+    value = fast_extract_value(field_name, user_input)
+    if value is not None:
+        FIELD_EXTRACTIONS.inc(path="fast_path")
+        logging.info(f"Fast-path extraction for {field_name}: {value}")
+        return value
+    if proposed_value is not None:
+        # Already extracted by the combined registration turn call
+        FIELD_EXTRACTIONS.inc(path="combined_call")
+        return proposed_value
+    if not speculative:
+        FIELD_EXTRACTIONS.inc(path="llm_fallback")
+    extracted = run_llm_chain("extract_clean_value", llm_chain("extract_clean_value"), {
+        "field_name": field_name,
+        "user_input": user_input,
+    })
     return extracted.strip()
 
 ###########################
 # Q&A Logic (Question Mode)
 ###########################
-def answer_university_question(question):
+def university_question_context(question, kb=None):
+    kb = kb or get_knowledge()
+    information = None
+    if RETRIEVAL_TOP_K > 0:
+        information = kb.university_index.build_context(question, RETRIEVAL_TOP_K, RETRIEVAL_MIN_COVERAGE)
+        if information is None:
+            logging.info("Question context: no confident retrieval match; sending the whole document.")
+        elif kb.university_information:
+            reduction = 100 * (1 - len(information) / len(kb.university_information))
+            logging.info(f"Question context: {len(information)} of {len(kb.university_information)} chars ({reduction:.1f}% smaller prompt).")
+    if information is None:
+        information = kb.university_information
+    return {"information": information, "question": question}
+
+def answer_university_question(question, kb=None):
     if not question.strip():
         return "Please provide a valid question."
-    template = """
-You are an intelligent assistant. Answer the following question using only the information provided below. If the information does not contain an answer, respond with "The provided information does not contain an answer to this question."
-
-Information: {information}
-Question: {question}
-"""
-    prompt = PromptTemplate(template=template, input_variables=["information", "question"])
-    llm_chain = LLMChain(prompt=prompt, llm=llm)
-    answer = llm_chain.run({"information": university_information, "question": question})
+    answer = run_llm_chain("answer_university_question", llm_chain("answer_university_question"),
+                           university_question_context(question, kb))
     return answer.strip()
 
+def answer_questions_batch(questions, workers=BATCH_MAX_WORKERS):
+    # Answers every question against one knowledge snapshot, so a reload
+    # mid-batch cannot mix document versions. The answer cache is skipped:
+    # this is meant for checking fresh answers after a document update.
+    kb = get_knowledge()
+
+    def answer_one(question):
+        started = time.perf_counter()
+        result = {"question": question}
+        try:
+            result["answer"] = answer_university_question(question, kb)
+        except Exception as e:
+            logging.error(f"Batch answer failed for {question!r}: {e}")
+            result["error"] = type(e).__name__
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch-answer") as pool:
+        results = list(pool.map(answer_one, questions))
+    return results, kb.university_fingerprint
+
+def stream_university_answer(question):
+    # Yields answer fragments as the model produces them
+    if not question.strip():
+        yield "Please provide a valid question."
+        return
+    chain = prompt_registry.prompts["answer_university_question"] | get_llm()
+    context = university_question_context(question)
+    # Streams take a dispatcher slot for their whole duration but are neither
+    # coalesced nor retried, since fragments may already have been sent
+    with llm_dispatcher.slot():
+        yield from _stream_chain("stream_university_answer", chain, context)
+
+def _stream_chain(call_site, chain, inputs):
+    started = time.perf_counter()
+    first_token = True
+    try:
+        for chunk in chain.stream(inputs):
+            if first_token:
+                LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started, call_site=call_site)
+                first_token = False
+            # Chat models yield message chunks, plain LLMs yield strings
+            yield getattr(chunk, "content", chunk)
+    except Exception as e:
+        LLM_ERRORS.inc(call_site=call_site, error=type(e).__name__)
+        raise
+    finally:
+        LLM_CALLS.inc(call_site=call_site)
+        LLM_LATENCY.observe(time.perf_counter() - started, call_site=call_site)
+
+answer_cache = None
+answer_cache_lock = threading.Lock()
+
+def get_answer_cache():
+    global answer_cache
+    if answer_cache is None and ANSWER_CACHE_ENABLED:
+        fingerprint = get_knowledge().university_fingerprint
+        with answer_cache_lock:
+            if answer_cache is None:
+                with startup_step("answer_cache"):
+                    answer_cache = AnswerCache(
+                        ANSWER_CACHE_FILE,
+                        fingerprint,
+                        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                        ttl_seconds=ANSWER_CACHE_TTL,
+                        fuzzy=ANSWER_CACHE_FUZZY,
+                        save_interval=ANSWER_CACHE_SAVE_INTERVAL,
+                    )
+    return answer_cache
+
+def cache_answer(answer_cache, fingerprint, question, answer):
+    # An answer computed from a document that was swapped out meanwhile is not cached
+    if answer_cache.fingerprint == fingerprint:
+        answer_cache.put(question, answer)
+
+def cached_answer_university_question(question):
+    answer_cache = get_answer_cache()
+    if answer_cache is None or not question.strip():
+        return answer_university_question(question)
+    fingerprint = get_knowledge().university_fingerprint
+    answer = answer_cache.get(question)
+    if answer is None:
+        answer = answer_university_question(question)
+        cache_answer(answer_cache, fingerprint, question, answer)
+    else:
+        logging.info(f"Answer cache hit: {question!r}")
+    return answer
+
+def sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+def stream_cached_answer_university_question(question):
+    # Server-sent events: one {"token"} event per fragment, then a final
+    # {"answer", "done"} event carrying the full answer for the session log
+    answer_cache = get_answer_cache()
+    fingerprint = get_knowledge().university_fingerprint
+    answer = answer_cache.get(question) if answer_cache is not None and question.strip() else None
+    if answer is not None:
+        logging.info(f"Answer cache hit: {question!r}")
+        yield sse_event({"answer": answer, "done": True})
+        return
+    fragments = []
+    try:
+        for fragment in stream_university_answer(question):
+            if fragment:
+                fragments.append(fragment)
+                yield sse_event({"token": fragment})
+    except LLMBusyError:
+        yield sse_event({"error": LLM_BUSY_MESSAGE, "busy": True, "done": True})
+        return
+    except Exception as e:
+        logging.error(f"Streaming answer failed for {question!r}: {e}")
+        yield sse_event({"error": "Error generating answer. Please try again.", "done": True})
+        return
+    answer = "".join(fragments).strip()
+    if answer_cache is not None and question.strip():
+        cache_answer(answer_cache, fingerprint, question, answer)
+    yield sse_event({"answer": answer, "done": True})
+
+def warm_up_answer_cache():
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        answer_cache.warm_up(load_faq_questions(FAQ_FILE), answer_university_question)
+
 ##################################
 # Registration Logic (Registration Mode)
 ##################################
 def init_registration_session(session_id):
-    sessions[session_id] = {
-        "current_field_index": 0,
-        "data": {},
-        "completed": False,
-        "editing_field": None,  # Track if user is currently editing a field
-        "awaiting_finalization": False  # Track if awaiting user to finalize or edit
-    }
-    logging.info(f"Initialized new registration session: {session_id}")
-
-def registration_ask_next_field(session_data):
-    if session_data["current_field_index"] >= len(data_fields_list):
+    session_data = session_store.create(session_id)
+    logging.info(f"Initialized new registration session: {session_id} ({session_store.metrics()['live_sessions']} live)")
+    return session_data
+
+def next_missing_field_index(data):
+    for index, (field_name, _) in enumerate(data_fields_list):
+        if field_name not in data:
+            return index
+    return len(data_fields_list)
+
+def registration_ask_next_field(session_data, saved_fields=None):
+    if session_data.current_field_index >= len(data_fields_list):
         # All fields filled, display summary and ask for confirmation
-        summary = summarize_registration(session_data["data"])
-        session_data["awaiting_finalization"] = True
+        summary = summarize_registration(session_data.data)
+        session_data.awaiting_finalization = True
         return f"Registration completed!\n\nSummary:\n{summary}\n\nDo you want to edit anything on the data or finalize the registration? (Type 'edit' to make changes or 'finalize' to complete)"
     else:
-        current_index = session_data["current_field_index"]
+        current_index = session_data.current_field_index
         field_name = data_fields_list[current_index][0]
+        if saved_fields:
+            # Confirm exactly what this message saved; after a jump past filled
+            # fields the previous index is not necessarily one of them
+            saved = ",\n".join(f"{name}: {session_data.data[name]}" for name in saved_fields)
+            response = f"{saved},\nPlease provide your {field_name}."
         # Check if there is a previously saved field
-        if current_index > 0:
+        elif current_index > 0:
             previous_field_name = data_fields_list[current_index - 1][0]
-            previous_value = session_data["data"].get(previous_field_name, "No value saved")
+            previous_value = session_data.data.get(previous_field_name, "No value saved")
             response = f"{previous_field_name}: {previous_value},\nPlease provide your {field_name}."
         else:
             # First field in the registration process
@@ -330,41 +604,28 @@ def summarize_registration(data):
     return summary
 
 def answer_registration_question(user_question, current_field_name):
-    template = f"""
-You are a helpful assistant that can answer questions about the registration process.
-The following information might help:
-
-{registration_info}
-
-Current Field: {current_field_name}
-
-User's question: {user_question}
-
-If you have enough info, answer. If not, respond "I'm sorry, I don't have the information to answer that."
-"""
-    prompt = PromptTemplate(input_variables=[], template=template)
-    llm_chain_question = LLMChain(prompt=prompt, llm=llm)
-    answer = llm_chain_question.run({})
+    # Only the guidance for the fields the question is about (or the field being asked for)
+    field_names = mentioned_fields(user_question) or [current_field_name]
+    kb = get_knowledge()
+    information = kb.registration_context(field_names)
+    logging.info(f"Registration context for {', '.join(field_names)}: {len(information)} of {len(kb.registration_info)} chars.")
+    answer = run_llm_chain("answer_registration_question", llm_chain("answer_registration_question"), {
+        "information": information,
+        "current_field": current_field_name,
+        "user_question": user_question,
+    })
     return answer.strip()
 
 ##################################
 # Intent & Edit Handling
 ##################################
-def determine_intent(user_input, current_field):
-    template = f"""You are a helpful assistant assisting with student registration. The user is currently being prompted to enter the field: "{current_field}" (if any).
-
-Determine whether the following user input is:
-1. A registration field value to be stored.
-2. A question that needs to be answered.
-3. An edit command to change a previously entered field.
+speculation_pool = ThreadPoolExecutor(max_workers=SPECULATION_WORKERS, thread_name_prefix="speculative-extraction")
 
-User Input: "{user_input}"
-
-Respond with "field" if it's a registration field value, "question" if it's a question, or "edit" if it's an edit command.
-"""
-    prompt = PromptTemplate(input_variables=[], template=template)
-    llm_chain_intent = LLMChain(prompt=prompt, llm=llm)
-    response = llm_chain_intent.run({})
+def determine_intent(user_input, current_field):
+    response = run_llm_chain("determine_intent", llm_chain("determine_intent"), {
+        "current_field": current_field,
+        "user_input": user_input,
+    })
     intent = response.strip().lower()
     logging.info(f"Determine Intent Response: {intent}")
     if "edit" in intent:
@@ -378,38 +639,12 @@ Respond with "field" if it's a registration field value, "question" if it's a qu
         return "field"
 
 def extract_field_to_edit(user_input):
-    template = """
-You are a helpful assistant assisting with student registration. Your task is to determine which registration field the user wants to edit based on their input.
-
-Here are the available fields:
-- "Student Full Name"
-- "Date of Birth"
-- "Gender"
-- "Nationality"
-- "National ID"
-- "Mobile Number"
-- "Email Address"
-- "Parent/Guardian Name"
-- "Parent/Guardian Contact Number"
-- "Parent/Guardian Email Address"
-- "High School Name"
-- "Graduation Year"
-- "GPA"
-- "Preferred Major/Program"
-
-The user might refer to these fields in various ways, including using abbreviations or partial terms.
-
-User Input: "{user_input}"
-
-Please respond with the exact field name from the list above that the user intends to edit. If the field cannot be determined, respond with "unknown".
-"""
-    prompt = PromptTemplate(input_variables=["user_input"], template=template)
-    llm_chain_extract_field = LLMChain(prompt=prompt, llm=llm)
-    response = llm_chain_extract_field.run({"user_input": user_input})
+    response = run_llm_chain("extract_field_to_edit", llm_chain("extract_field_to_edit"), {"user_input": user_input})
     field = response.strip()
     logging.info(f"Extract Field to Edit Response: {field}")
+    return normalize_field_name(field)
 
-    # Normalize field name if needed
+def normalize_field_name(field):
     for key in data_fields.keys():
         if key.lower() == field.lower():
             return key
@@ -420,9 +655,276 @@ Please respond with the exact field name from the list above that the user inten
 
     return "unknown"
 
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
+def parse_turn_response(response):
+    # Models sometimes wrap JSON in code fences or add prose around it
+    match = JSON_OBJECT_PATTERN.search(response)
+    if not match:
+        return None
+    try:
+        parsed = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    intent = str(parsed.get("intent", "")).strip().lower()
+    if intent not in ("field", "question", "edit"):
+        return None
+    value = parsed.get("value")
+    value = str(value).strip() if value is not None else ""
+    if value.lower() in ("", "no data", "null", "none"):
+        value = None
+    field = parsed.get("field")
+    field = normalize_field_name(str(field).strip()) if field else "unknown"
+    fields = {}
+    if isinstance(parsed.get("fields"), dict):
+        for name, field_value in parsed["fields"].items():
+            name = normalize_field_name(str(name).strip())
+            field_value = str(field_value).strip() if field_value is not None else ""
+            if name != "unknown" and field_value.lower() not in ("", "no data", "null", "none"):
+                fields[name] = field_value
+    # "no_value": the model looked for a value for the current field and found none
+    return {"intent": intent, "value": value, "field": field, "fields": fields,
+            "no_value": intent == "field" and value is None}
+
+def interpret_registration_turn(user_input, current_field):
+    response = run_llm_chain("interpret_registration_turn", llm_chain("interpret_registration_turn"), {
+        "current_field": current_field,
+        "field_names": ", ".join(f'"{name}"' for name, _ in data_fields_list),
+        "user_input": user_input,
+        "fields_schema": TURN_FIELDS_SCHEMA if MULTI_FIELD_EXTRACTION else "",
+    })
+    turn = parse_turn_response(response)
+    logging.info(f"Interpret Turn Response: {turn if turn else response.strip()}")
+    return turn
+
+def local_registration_turn(user_input, current_field):
+    # Returns a turn without any LLM call when the local classifier is confident, else None
+    classifier = get_intent_classifier()
+    if classifier is None or not user_input.strip():
+        return None
+    intent, confidence = classifier.classify(user_input)
+    if confidence >= LOCAL_INTENT_THRESHOLD and intent == "field" and COMBINED_TURN_CALL:
+        other_fields = set(mentioned_fields(user_input)) - {current_field}
+        if fast_extract_value(current_field, user_input) is None or (MULTI_FIELD_EXTRACTION and other_fields):
+            # The combined call would extract the value(s) in the same request anyway
+            confidence = 0.0
+    if confidence < LOCAL_INTENT_THRESHOLD:
+        LOCAL_INTENT_DECISIONS.inc(decision="llm", intent=intent)
+        return None
+    LOCAL_INTENT_DECISIONS.inc(decision="local", intent=intent)
+    logging.info(f"Local intent: {intent} ({confidence:.2f})")
+    edit_fields = mentioned_fields(user_input) if intent == "edit" else []
+    return {"intent": intent, "value": None, "field": edit_fields[0] if len(edit_fields) == 1 else None, "fields": {}}
+
+def classify_registration_turn(user_input, current_field):
+    # One structured call when possible, falling back to the separate intent call
+    turn = interpret_registration_turn(user_input, current_field) if COMBINED_TURN_CALL else None
+    if turn is None:
+        turn = {"intent": determine_intent(user_input, current_field), "value": None, "field": None, "fields": {}}
+    return turn
+
+def store_extra_fields(session_id, session_data, fields):
+    # Only fields that are still empty and pass validation are stored;
+    # changing a value that was already given still goes through "edit"
+    stored = []
+    for field_name, value in fields.items():
+        if field_name in session_data.data:
+            continue
+        # The deterministic extractors also normalize formats such as spaced phone numbers
+        value = fast_extract_value(field_name, value) or value
+        cleaned_value = clean_field(field_name, value)
+        is_valid, _ = data_fields[field_name](cleaned_value)
+        if is_valid:
+            session_data.data[field_name] = cleaned_value
+            stored.append(field_name)
+    if stored:
+        logging.info(f"Session {session_id} - Set {', '.join(stored)} from the same message")
+    return stored
+
+def begin_field_edit(session_data, user_input, field_to_edit=None):
+    if not field_to_edit or field_to_edit == "unknown":
+        field_to_edit = extract_field_to_edit(user_input)
+    if field_to_edit == "unknown":
+        return "I'm sorry, I couldn't identify which field you want to edit."
+    # Check if field was previously filled
+    if field_to_edit in session_data.data:
+        # Prompt user for new value
+        session_data.editing_field = field_to_edit
+        return f"You want to edit {field_to_edit}. Please provide the new value."
+    return f"The field '{field_to_edit}' has not been filled yet. You can only edit fields that have been provided."
+
+def handle_registration_turn(session_id, session_data, question):
+    if session_data.completed:
+        # Already completed
+        return "Your registration is already completed."
+
+    if session_data.awaiting_finalization:
+        # User is responding to finalization prompt
+        user_input = question.strip().lower()
+        if user_input in ["edit", "yes", "i want to edit", "change", "modify"]:
+            return "Please specify which field you would like to edit."
+        elif user_input in ["finalize", "no", "no thanks", "finish", "complete"]:
+            try:
+                # Include session_id in the data for unique identification
+                session_data.data["session_id"] = session_id
+
+                # Queued for a batched upsert; the user does not wait on the database
+                get_registration_writer().submit(session_id, session_data.data)
+                session_data.completed = True
+                session_data.awaiting_finalization = False
+                logging.info(f"Session {session_id} - Data queued for saving: {session_data.data}")
+                return "Thank you for your registration! Your details have been saved."
+            except Exception as e:
+                logging.error(f"DB Insert error for session {session_id}: {e}")
+                return "Error saving registration. Please try again."
+        else:
+            # Determine if user wants to edit a specific field
+            turn = local_registration_turn(question, "") or classify_registration_turn(question, "")
+            if turn["intent"] == "edit":
+                return begin_field_edit(session_data, question, turn["field"])
+            else:
+                return "Please respond with 'edit' to make changes or 'finalize' to complete your registration."
+
+    # If we are editing a field
+    if session_data.editing_field:
+        # The current user_input is the new value for that field
+        field_to_edit = session_data.editing_field
+        # Extract clean value before validation
+        extracted_value = extract_clean_value(field_to_edit, question)
+        cleaned_value = clean_field(field_to_edit, extracted_value)
+        is_valid, error_msg = data_fields[field_to_edit](cleaned_value)
+        if is_valid:
+            session_data.data[field_to_edit] = cleaned_value
+            logging.info(f"Session {session_id} - Updated {field_to_edit} to {cleaned_value}")
+            session_data.editing_field = None
+            return registration_ask_next_field(session_data, [field_to_edit])
+        else:
+            return f"Invalid input for {field_to_edit}: {error_msg} Please try again."
+
+    # Normal flow
+    current_index = session_data.current_field_index
+    if current_index < len(data_fields_list):
+        current_field_name = data_fields_list[current_index][0]
+    else:
+        # All fields filled, ask for confirmation
+        summary = summarize_registration(session_data.data)
+        session_data.awaiting_finalization = True
+        return f"Registration completed!\n\nSummary:\n{summary}\n\nDo you want to edit anything on the data or finalize the registration? (Type 'edit' to make changes or 'finalize' to complete)"
+
+    # Determine intent, without the LLM when the local classifier is sure
+    turn = local_registration_turn(question, current_field_name)
+
+    speculation = None
+    if (turn is None and SPECULATIVE_EXTRACTION and not COMBINED_TURN_CALL and question.strip()
+            and fast_extract_value(current_field_name, question) is None):
+        # Most inputs are plain answers, so the LLM extraction starts before the intent is known
+        speculation = speculation_pool.submit(extract_clean_value, current_field_name, question, speculative=True)
+
+    if turn is None:
+        turn = classify_registration_turn(question, current_field_name)
+    intent = turn["intent"]
+    if speculation is not None:
+        # A wasted speculation still costs its tokens; the call is left to finish
+        SPECULATIVE_EXTRACTIONS.inc(outcome="used" if intent == "field" else "wasted")
+
+    if intent == "question":
+        # Answer a question about the registration process
+        ans = answer_registration_question(question, current_field_name)
+        return ans
+
+    elif intent == "edit":
+        # User wants to edit a previously entered field
+        return begin_field_edit(session_data, question, turn["field"])
+
+    else:
+        # Handle user input for the current field
+        if not question.strip():
+            # If no input is provided, simply ask the user for the current field
+            return f"Please provide your {current_field_name}."
+
+        proposed_value = turn["value"]
+        stored = []
+        if MULTI_FIELD_EXTRACTION:
+            fields = turn.get("fields", {})
+            if proposed_value is None:
+                proposed_value = fields.get(current_field_name)
+            stored = store_extra_fields(
+                session_id, session_data, {k: v for k, v in fields.items() if k != current_field_name})
+            if stored and proposed_value is None and fast_extract_value(current_field_name, question) is None:
+                # The message only carried other fields; move on without asking the LLM again
+                session_data.current_field_index = next_missing_field_index(session_data.data)
+                return registration_ask_next_field(session_data, stored)
+
+        if proposed_value is None and turn.get("no_value") and fast_extract_value(current_field_name, question) is None:
+            # The combined call already answered "No data"; a second extraction call would not do better
+            saved = f"Saved {', '.join(stored)}. " if stored else ""
+            return f"{saved}Invalid input for {current_field_name}: no {current_field_name} was found in your message. Please try again."
+
+        # Extract clean value before validation
+        if speculation is not None:
+            extracted_value = speculation.result()
+            FIELD_EXTRACTIONS.inc(path="llm_fallback")
+        else:
+            extracted_value = extract_clean_value(current_field_name, question, proposed_value)
+        cleaned_value = clean_field(current_field_name, extracted_value)
+        is_valid, error_msg = data_fields[current_field_name](cleaned_value)
+        if is_valid:
+            session_data.data[current_field_name] = cleaned_value
+            logging.info(f"Session {session_id} - Set {current_field_name} to {cleaned_value}")
+            # Jump past fields that were already filled from earlier messages
+            session_data.current_field_index = next_missing_field_index(session_data.data)
+            next_msg = registration_ask_next_field(session_data, [current_field_name] + stored)
+            return next_msg
+        else:
+            saved = f"Saved {', '.join(stored)}. " if stored else ""
+            return f"{saved}Invalid input for {current_field_name}: {error_msg} Please try again."
+
+LLM_BUSY_MESSAGE = "The assistant is busy right now. Please try again in a moment."
+
+def busy_response():
+    # Backpressure: clients should retry later instead of piling onto the queue
+    response = make_response(jsonify({"answer": LLM_BUSY_MESSAGE}), 503)
+    response.headers["Retry-After"] = str(max(1, round(LLM_QUEUE_TIMEOUT)))
+    return response
+
+@app.errorhandler(LLMBusyError)
+def llm_busy_handler(error):
+    logging.warning(f"LLM dispatcher rejected a call: {error}")
+    return busy_response()
+
 @app.route("/chat", methods=["POST"])
 def chat_endpoint():
+    started = time.perf_counter()
     data = request.get_json()
+    mode = data.get("mode", "question")
+    # Label values are bounded so a client cannot blow up metric cardinality
+    mode_label = mode if mode in ("question", "registration") else "unknown"
+    status = 500
+    streamed = False
+
+    def record():
+        CHAT_REQUESTS.inc(mode=mode_label, status=status)
+        CHAT_LATENCY.observe(time.perf_counter() - started, mode=mode_label)
+
+    try:
+        try:
+            response = make_response(handle_chat_request(data))
+        except LLMBusyError as e:
+            response = llm_busy_handler(e)
+        status = response.status_code
+        if response.is_streamed:
+            # Timed to the end of the SSE stream, not to when the generator is handed to the server
+            mode_label = f"{mode_label}_stream"
+            response.call_on_close(record)
+            streamed = True
+        return response
+    finally:
+        if not streamed:
+            record()
+
+def handle_chat_request(data):
     question = data.get("question", "")
     mode = data.get("mode", "question")
     session_id = data.get("session_id")
@@ -433,129 +935,230 @@ def chat_endpoint():
 
     if mode == "question":
         # One-turn Q&A
-        answer = answer_university_question(question)
+        if data.get("stream"):
+            # Opt-in token streaming; the JSON response below stays the default
+            return Response(
+                stream_with_context(stream_cached_answer_university_question(question)),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        answer = cached_answer_university_question(question)
         return jsonify({"answer": answer})
 
     elif mode == "registration":
         # Handle registration steps
-        if session_id not in sessions:
-            init_registration_session(session_id)
-
-        session_data = sessions[session_id]
-        logging.info(f"Session {session_id} - Current Data: {session_data['data']}")
-
-        if session_data["completed"]:
-            # Already completed
-            return jsonify({"answer": "Your registration is already completed."})
-
-        if session_data["awaiting_finalization"]:
-            # User is responding to finalization prompt
-            user_input = question.strip().lower()
-            if user_input in ["edit", "yes", "i want to edit", "change", "modify"]:
-                return jsonify({"answer": "Please specify which field you would like to edit."})
-            elif user_input in ["finalize", "no", "no thanks", "finish", "complete"]:
-                try:
-                    # Include session_id in the data for unique identification
-                    session_data["data"]["session_id"] = session_id
-
-                    registrations_collection.update_one(
-                        {"session_id": session_id},
-                        {"$set": session_data["data"]},
-                        upsert=True
-                    )
-                    session_data["completed"] = True
-                    session_data["awaiting_finalization"] = False
-                    logging.info(f"Session {session_id} - Data saved: {session_data['data']}")
-                    return jsonify({"answer": "Thank you for your registration! Your details have been saved."})
-                except Exception as e:
-                    logging.error(f"DB Insert error for session {session_id}: {e}")
-                    return jsonify({"answer": "Error saving registration. Please try again."})
-            else:
-                # Determine if user wants to edit a specific field
-                intent = determine_intent(question, "")
-                if intent == "edit":
-                    field_to_edit = extract_field_to_edit(question)
-                    if field_to_edit == "unknown":
-                        return jsonify({"answer": "I'm sorry, I couldn't identify which field you want to edit."})
-                    # Check if field was previously filled
-                    if field_to_edit in session_data["data"]:
-                        # Prompt user for new value
-                        session_data["editing_field"] = field_to_edit
-                        return jsonify({"answer": f"You want to edit {field_to_edit}. Please provide the new value."})
-                    else:
-                        return jsonify({"answer": f"The field '{field_to_edit}' has not been filled yet. You can only edit fields that have been provided."})
-                else:
-                    return jsonify({"answer": "Please respond with 'edit' to make changes or 'finalize' to complete your registration."})
-
-        # If we are editing a field
-        if session_data["editing_field"]:
-            # The current user_input is the new value for that field
-            field_to_edit = session_data["editing_field"]
-            # Extract clean value before validation
-            extracted_value = extract_clean_value(field_to_edit, question)
-            cleaned_value = clean_field(field_to_edit, extracted_value)
-            is_valid, error_msg = data_fields[field_to_edit](cleaned_value)
-            if is_valid:
-                session_data["data"][field_to_edit] = cleaned_value
-                logging.info(f"Session {session_id} - Updated {field_to_edit} to {cleaned_value}")
-                session_data["editing_field"] = None
-                return jsonify({"answer": f"{registration_ask_next_field(session_data)}"})
-            else:
-                return jsonify({"answer": f"Invalid input for {field_to_edit}: {error_msg} Please try again."})
-
-        # Normal flow
-        current_index = session_data["current_field_index"]
-        if current_index < len(data_fields_list):
-            current_field_name = data_fields_list[current_index][0]
-        else:
-            # All fields filled, ask for confirmation
-            summary = summarize_registration(session_data["data"])
-            session_data["awaiting_finalization"] = True
-            return jsonify({"answer": f"Registration completed!\n\nSummary:\n{summary}\n\nDo you want to edit anything on the data or finalize the registration? (Type 'edit' to make changes or 'finalize' to complete)"})
-
-        # Determine intent
-        intent = determine_intent(question, current_field_name)
-
-        if intent == "question":
-            # Answer a question about the registration process
-            ans = answer_registration_question(question, current_field_name)
-            return jsonify({"answer": ans})
-
-        elif intent == "edit":
-            # User wants to edit a previously entered field
-            field_to_edit = extract_field_to_edit(question)
-            if field_to_edit == "unknown":
-                return jsonify({"answer": "I'm sorry, I couldn't identify which field you want to edit."})
-            # Check if field was previously filled
-            if field_to_edit in session_data["data"]:
-                # Prompt user for new value
-                session_data["editing_field"] = field_to_edit
-                return jsonify({"answer": f"You want to edit {field_to_edit}. Please provide the new value."})
-            else:
-                return jsonify({"answer": f"The field '{field_to_edit}' has not been filled yet. You can only edit fields that have been provided."})
+        session_data = session_store.get(session_id)
+        if session_data is None:
+            session_data = init_registration_session(session_id)
+        logging.info(f"Session {session_id} - Current Data: {session_data.data}")
 
-        else:
-            # Handle user input for the current field
-            if not question.strip():
-                # If no input is provided, simply ask the user for the current field
-                return jsonify({"answer": f"Please provide your {current_field_name}."})
-
-            # Extract clean value before validation
-            extracted_value = extract_clean_value(current_field_name, question)
-            cleaned_value = clean_field(current_field_name, extracted_value)
-            is_valid, error_msg = data_fields[current_field_name](cleaned_value)
-            if is_valid:
-                session_data["data"][current_field_name] = cleaned_value
-                logging.info(f"Session {session_id} - Set {current_field_name} to {cleaned_value}")
-                session_data["current_field_index"] += 1
-                next_msg = registration_ask_next_field(session_data)
-                return jsonify({"answer": next_msg})
-            else:
-                return jsonify({"answer": f"Invalid input for {current_field_name}: {error_msg} Please try again."})
+        try:
+            answer = handle_registration_turn(session_id, session_data, question)
+        finally:
+            # Shared backends only see changes once the session is written back
+            session_store.save(session_data)
+        return jsonify({"answer": answer})
 
     else:
         logging.warning(f"Unknown mode received: {mode}")
         return jsonify({"answer": "Unknown mode."}), 400
 
+def admin_authorized():
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_API_TOKEN) and hmac.compare_digest(token, ADMIN_API_TOKEN)
+
+@app.route("/admin/reload-knowledge", methods=["POST"])
+def reload_knowledge_endpoint():
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized."}), 403
+    try:
+        if knowledge is None:
+            get_knowledge()
+            changed = []
+        else:
+            changed = reload_knowledge()
+    except Exception as e:
+        logging.error(f"Knowledge reload failed: {e}")
+        return jsonify({"error": "Reload failed."}), 500
+    kb = get_knowledge()
+    return jsonify({
+        "reloaded": changed,
+        "chunks": len(kb.university_index.chunks),
+        "fingerprint": kb.university_fingerprint,
+    })
+
+@app.route("/admin/registrations/import", methods=["POST"])
+def import_registrations_endpoint():
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized."}), 403
+    # Either a multipart upload named "file" or the raw request body
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get("format") or detect_format(upload.filename if upload else "")
+    dry_run = request.args.get("dry_run") == "1"
+
+    errors = []
+    def collect_error(number, record_errors):
+        # Only the first IMPORT_MAX_ERRORS are returned so memory stays bounded
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"record": number, "errors": record_errors})
+
+    try:
+        collection = None
+        if not dry_run:
+            collection = get_registrations_collection()
+            # Every upsert filters on National ID; without the index each one scans the collection
+            ensure_indexes(collection)
+        summary = import_registrations(
+            iter_records(stream, fmt),
+            collection,
+            batch_size=IMPORT_BATCH_SIZE,
+            on_error=collect_error,
+            dry_run=dry_run,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Bulk import failed: {e}")
+        return jsonify({"error": "Import failed."}), 500
+    logging.info(f"Bulk import: {summary}")
+    return jsonify({"summary": summary, "errors": errors, "errors_truncated": summary["invalid"] > len(errors)})
+
+@app.route("/admin/registrations/export", methods=["GET"])
+def export_registrations_endpoint():
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized."}), 403
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}."}), 400
+    fields = DEFAULT_EXPORT_FIELDS
+    if request.args.get("fields"):
+        # Projection: only the requested fields are read from MongoDB
+        fields = []
+        for name in request.args["fields"].split(","):
+            field_name = name.strip() if name.strip() in ("session_id", "source") else canonical_field(name)
+            if not field_name:
+                return jsonify({"error": f"Unknown field '{name.strip()}'."}), 400
+            fields.append(field_name)
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(iter_export(get_registrations_collection(), fmt, fields, EXPORT_BATCH_SIZE)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=registrations.{fmt}"},
+    )
+
+@app.route("/admin/questions/batch", methods=["POST"])
+def batch_questions_endpoint():
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized."}), 403
+    data = request.get_json(silent=True) or {}
+    questions = data.get("questions")
+    if questions is None:
+        # Defaults to the FAQ regression set
+        questions = load_faq_questions(FAQ_FILE)
+    if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+        return jsonify({"error": "questions must be a list of strings."}), 400
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return jsonify({"error": f"At most {BATCH_MAX_QUESTIONS} questions per batch."}), 400
+    try:
+        workers = min(int(data.get("workers", BATCH_MAX_WORKERS)), BATCH_MAX_WORKERS)
+    except (TypeError, ValueError):
+        return jsonify({"error": "workers must be an integer."}), 400
+    started = time.perf_counter()
+    results, fingerprint = answer_questions_batch(questions, workers)
+    return jsonify({
+        "results": results,
+        "fingerprint": fingerprint,
+        "seconds": round(time.perf_counter() - started, 2),
+        "failed": sum(1 for r in results if "error" in r),
+    })
+
+registration_stats_cache = CachedValue(lambda: registration_stats(get_registrations_collection()), STATS_CACHE_TTL)
+
+@app.route("/admin/registrations/stats", methods=["GET"])
+def registration_stats_endpoint():
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized."}), 403
+    try:
+        stats, age = registration_stats_cache.get()
+    except Exception as e:
+        logging.error(f"Registration stats failed: {e}")
+        return jsonify({"error": "Stats failed."}), 500
+    return jsonify({"stats": stats, "age_seconds": round(age, 1)})
+
+def _answer_cache_stats():
+    if answer_cache is None:
+        return None
+    return {"hit": answer_cache.hits, "miss": answer_cache.misses}
+
+def _session_evictions():
+    stats = session_store.metrics()
+    return {"expired": stats["evicted_expired"], "capacity": stats["evicted_capacity"]}
+
+def _writer_stats():
+    return dict(registration_writer.stats) if registration_writer is not None else None
+
+def _dispatch_stats():
+    stats = llm_dispatcher.metrics()
+    return {event: stats[event] for event in ("coalesced", "retries", "rejected")}
+
+def _dispatch_slots():
+    stats = llm_dispatcher.metrics()
+    return {state: stats[state] for state in ("running", "waiting")}
+
+metrics.gauge_function("answer_cache_lookups_total", "Question-mode answer cache lookups by result.", _answer_cache_stats, "result", kind="counter")
+metrics.gauge_function("answer_cache_entries", "Entries in the answer cache.", lambda: len(answer_cache.entries) if answer_cache is not None else None)
+metrics.gauge_function("registration_sessions_live", "Live registration sessions.", lambda: session_store.metrics()["live_sessions"])
+metrics.gauge_function("registration_sessions_evicted_total", "Registration sessions evicted by reason.", _session_evictions, "reason", kind="counter")
+metrics.gauge_function("registration_writes_total", "Write-behind registration persistence events.", _writer_stats, "event", kind="counter")
+metrics.gauge_function("registration_writes_pending", "Finalized registrations waiting to be written.",
+                       lambda: registration_writer.pending() if registration_writer is not None else None)
+metrics.gauge_function("llm_dispatch_events_total", "LLM dispatcher events (coalesced/retries/rejected).", _dispatch_stats, "event", kind="counter")
+metrics.gauge_function("llm_dispatch_calls", "LLM calls holding or waiting for a dispatcher slot.", _dispatch_slots, "state")
+metrics.gauge_function("knowledge_chunks", "Retrieval chunks in the loaded knowledge base.",
+                       lambda: len(knowledge.university_index.chunks) if knowledge is not None else None)
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+if not LAZY_INIT:
+    # Only state that survives a fork is loaded here. The Mongo client and the
+    # registration writer thread are still created on first use, in the worker
+    # that uses them, so a preloading master (gunicorn --preload) can fork safely.
+    get_knowledge()
+    get_intent_classifier()
+    get_answer_cache()
+    get_llm()
+    for name in prompt_registry.prompts:
+        llm_chain(name)
+
+def start_background_threads():
+    if ANSWER_CACHE_ENABLED and ANSWER_CACHE_WARMUP:
+        # Pre-answer the FAQ in the background so startup is not delayed
+        threading.Thread(target=warm_up_answer_cache, daemon=True).start()
+    if KNOWLEDGE_WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_knowledge_files, name="knowledge-watcher", daemon=True).start()
+
+def reset_after_fork():
+    # Threads do not survive fork and pooled connections must not be shared
+    # with the parent: drop them so the worker creates its own on first use.
+    global llm, mongo_client, registrations_collection, registration_writer
+    llm = None
+    mongo_client = None
+    registrations_collection = None
+    registration_writer = None
+    if KNOWLEDGE_WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_knowledge_files, name="knowledge-watcher", daemon=True).start()
+
+start_background_threads()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_after_fork)
+
+logging.info(
+    f"Startup: main.py ready in {(time.perf_counter() - import_started) * 1000:.1f} ms "
+    f"({', '.join(f'{name}={ms:.1f}ms' for name, ms in startup_timings.items()) or 'all resources deferred'})."
+)
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000, debug=True)
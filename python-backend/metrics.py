@@ -0,0 +1,124 @@
+# metrics.py
+#
+# Minimal in-process metrics with Prometheus text exposition. Updates are a
+# lock and a dict increment, so they are cheap enough to leave on everywhere.
+
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in self.values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def samples(self):
+        out = []
+        with self.lock:
+            for key, state in self.values.items():
+                for i, bound in enumerate(self.buckets):
+                    out.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, [("le", bound)]), state[i]))
+                count = state[len(self.buckets)]
+                out.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, [("le", "+Inf")]), count))
+                out.append((f"{self.name}_sum", _format_labels(self.labelnames, key), state[-1]))
+                out.append((f"{self.name}_count", _format_labels(self.labelnames, key), count))
+        return out
+
+
+class GaugeFunction:
+    # Read at scrape time from state that already lives elsewhere
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn, labelname=None, kind="gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.fn = fn
+        self.labelname = labelname
+        self.kind = kind
+
+    def samples(self):
+        value = self.fn()
+        if value is None:
+            return []
+        if self.labelname is None:
+            return [(self.name, "", value)]
+        return [(self.name, _format_labels((self.labelname,), (label,)), v) for label, v in value.items()]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge_function(self, name, help_text, fn, labelname=None, kind="gauge"):
+        return self._add(GaugeFunction(name, help_text, fn, labelname, kind))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            try:
+                samples = metric.samples()
+            except Exception:
+                # A broken collector must not take down the whole scrape
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
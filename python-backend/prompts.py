@@ -0,0 +1,128 @@
+# prompts.py
+#
+# Every LLM prompt in one place. Templates are parsed into PromptTemplates once
+# and chains are built once per LLM instance, instead of on every call. User
+# text is always passed as an input variable, never formatted into the
+# template itself, so braces in user input cannot break a prompt.
+
+import threading
+
+from langchain import PromptTemplate, LLMChain
+
+EXTRACT_VALUE_TEMPLATE = """
+You are a helpful assistant. The user is being asked to provide their {field_name} for a registration form.
+They may include additional text, but you must extract only the {field_name} from their message.
+If you cannot find a clear {field_name}, respond with "No data".
+
+Field: {field_name}
+User Input: {user_input}
+
+Please return only the exact {field_name} with no additional text, no explanations, and no formatting other than the value itself.
+"""
+
+UNIVERSITY_QUESTION_TEMPLATE = """
+You are an intelligent assistant. Answer the following question using only the information provided below. If the information does not contain an answer, respond with "The provided information does not contain an answer to this question."
+
+Information: {information}
+Question: {question}
+"""
+
+REGISTRATION_QUESTION_TEMPLATE = """
+You are a helpful assistant that can answer questions about the registration process.
+The following information might help:
+
+{information}
+
+Current Field: {current_field}
+
+User's question: {user_question}
+
+If you have enough info, answer. If not, respond "I'm sorry, I don't have the information to answer that."
+"""
+
+DETERMINE_INTENT_TEMPLATE = """You are a helpful assistant assisting with student registration. The user is currently being prompted to enter the field: "{current_field}" (if any).
+
+Determine whether the following user input is:
+1. A registration field value to be stored.
+2. A question that needs to be answered.
+3. An edit command to change a previously entered field.
+
+User Input: "{user_input}"
+
+Respond with "field" if it's a registration field value, "question" if it's a question, or "edit" if it's an edit command.
+"""
+
+EDIT_FIELD_TEMPLATE = """
+You are a helpful assistant assisting with student registration. Your task is to determine which registration field the user wants to edit based on their input.
+
+Here are the available fields:
+- "Student Full Name"
+- "Date of Birth"
+- "Gender"
+- "Nationality"
+- "National ID"
+- "Mobile Number"
+- "Email Address"
+- "Parent/Guardian Name"
+- "Parent/Guardian Contact Number"
+- "Parent/Guardian Email Address"
+- "High School Name"
+- "Graduation Year"
+- "GPA"
+- "Preferred Major/Program"
+
+The user might refer to these fields in various ways, including using abbreviations or partial terms.
+
+User Input: "{user_input}"
+
+Please respond with the exact field name from the list above that the user intends to edit. If the field cannot be determined, respond with "unknown".
+"""
+
+REGISTRATION_TURN_TEMPLATE = """You are a helpful assistant assisting with student registration. The user is currently being prompted to enter the field: "{current_field}" (if any).
+
+Classify the user input as one of:
+- "field": a value for the current field.
+- "question": a question that needs to be answered.
+- "edit": a request to change a previously entered field.
+
+Registration fields: {field_names}
+
+User Input: "{user_input}"
+
+Respond with only a JSON object of the form:
+{{"intent": "field" | "question" | "edit", "value": <the exact {current_field} value from the input if intent is "field", otherwise null>, "field": <the exact registration field name to edit if intent is "edit", otherwise null>{fields_schema}}}
+Return the value with no additional text. If the intent is "field" but no clear value is present, use "No data" as the value.
+"""
+
+# Asks the combined turn call for any other field values pasted into the same message
+TURN_FIELDS_SCHEMA = ', "fields": <an object mapping every other registration field whose value is clearly given in the input to that exact value, otherwise {}>'
+
+# name -> (template, input variables)
+PROMPT_TEMPLATES = {
+    "extract_clean_value": (EXTRACT_VALUE_TEMPLATE, ["field_name", "user_input"]),
+    "answer_university_question": (UNIVERSITY_QUESTION_TEMPLATE, ["information", "question"]),
+    "answer_registration_question": (REGISTRATION_QUESTION_TEMPLATE, ["information", "current_field", "user_question"]),
+    "determine_intent": (DETERMINE_INTENT_TEMPLATE, ["current_field", "user_input"]),
+    "extract_field_to_edit": (EDIT_FIELD_TEMPLATE, ["user_input"]),
+    "interpret_registration_turn": (REGISTRATION_TURN_TEMPLATE, ["current_field", "field_names", "user_input", "fields_schema"]),
+}
+
+
+class PromptRegistry:
+    def __init__(self, templates=PROMPT_TEMPLATES):
+        self.prompts = {
+            name: PromptTemplate(template=template, input_variables=input_variables)
+            for name, (template, input_variables) in templates.items()
+        }
+        self.chains = {}  # name -> (llm, chain)
+        self.lock = threading.Lock()
+
+    def chain(self, name, llm):
+        # Rebuilt only if the LLM instance changed (e.g. a stand-in assigned in benchmarks)
+        entry = self.chains.get(name)
+        if entry is None or entry[0] is not llm:
+            with self.lock:
+                entry = self.chains.get(name)
+                if entry is None or entry[0] is not llm:
+                    entry = self.chains[name] = (llm, LLMChain(prompt=self.prompts[name], llm=llm))
+        return entry[1]
@@ -0,0 +1,231 @@
+# registration_fields.py
+
+import os
+import re
+from datetime import datetime
+
+from fuzzy_match import FuzzyIndex
+
+# Minimum similarity (0-1) for a misspelled nationality or major to be accepted
+FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", "0.8"))
+
+# Field name mapping from synonyms to canonical field names
+FIELD_NAME_MAPPING = {
+    'student full name': 'Student Full Name',
+    'full name': 'Student Full Name',
+    'dob': 'Date of Birth',
+    'date of birth': 'Date of Birth',
+    'gender': 'Gender',
+    'nationality': 'Nationality',
+    'national id': 'National ID',
+    'id number': 'National ID',
+    'id': 'National ID',
+    'mobile': 'Mobile Number',
+    'mobile number': 'Mobile Number',
+    'email': 'Email Address',
+    'parent name': 'Parent/Guardian Name',
+    'guardian name': 'Parent/Guardian Name',
+    'parent/guardian name': 'Parent/Guardian Name',
+    'parent contact': 'Parent/Guardian Contact Number',
+    'guardian contact': 'Parent/Guardian Contact Number',
+    'parent/guardian contact': 'Parent/Guardian Contact Number',
+    'parent email': 'Parent/Guardian Email Address',
+    'guardian email': 'Parent/Guardian Email Address',
+    'parent/guardian email': 'Parent/Guardian Email Address',
+    'high school': 'High School Name',
+    'graduation year': 'Graduation Year',
+    'gpa': 'GPA',
+    'preferred major': 'Preferred Major/Program',
+    'preferred program': 'Preferred Major/Program',
+}
+
+GENDER_MAP = {
+    'male': 'Male',
+    'm': 'Male',
+    'female': 'Female',
+    'f': 'Female',
+}
+
+PREFERRED_MAJOR_MAP = {
+    'cs': 'Computer Science',
+    'computer science': 'Computer Science',
+    'electrical engineering': 'Electrical Engineering',
+    'ee': 'Electrical Engineering',
+    'mechanical engineering': 'Mechanical Engineering',
+    'me': 'Mechanical Engineering',
+    'civil engineering': 'Civil Engineering',
+    'ce': 'Civil Engineering',
+    'aerospace engineering': 'Aerospace Engineering',
+    'ae': 'Aerospace Engineering',
+    'biomedical engineering': 'Biomedical Engineering',
+    'be': 'Biomedical Engineering',
+    'software engineering': 'Software Engineering',
+    'se': 'Software Engineering',
+    'environmental engineering': 'Environmental Engineering',
+    'enve': 'Environmental Engineering',
+    'robotics and automation': 'Robotics and Automation',
+    'ra': 'Robotics and Automation',
+    'data science': 'Data Science',
+    'ds': 'Data Science',
+}
+
+VALID_COUNTRIES = {
+    'Egypt': ['egypt', 'egyptian'],
+    'United States': ['united states', 'usa', 'us', 'america', 'american'],
+    'Canada': ['canada', 'canadian'],
+    'United Kingdom': ['united kingdom', 'uk', 'britain', 'british'],
+    'France': ['france', 'french'],
+    'Germany': ['germany', 'german'],
+    'India': ['india', 'indian'],
+    'China': ['china', 'chinese'],
+}
+
+##############
+# Validations
+##############
+# Patterns are compiled once here rather than on every validation
+NATIONAL_ID_PATTERN = re.compile(r"\d{14}")
+MOBILE_PATTERN = re.compile(r'^\+?\d{10,15}$')
+EMAIL_PATTERN = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+YEAR_PATTERN = re.compile(r"\d{4}")
+DIGITS_PATTERN = re.compile(r"\d+")
+VALID_MAJORS = frozenset(PREFERRED_MAJOR_MAP.values())
+
+def validate_full_name(name):
+    return len(name.strip().split()) >= 3, "Full name must contain at least three names."
+
+def validate_any(value):
+    return True, ""
+
+def validate_date_of_birth(dob):
+    for fmt in ("%d-%m-%Y", "%d/%m/%Y"):
+        try:
+            datetime.strptime(dob, fmt)
+            return True, ""
+        except ValueError:
+            continue
+    return False, "Date of Birth must be in the format DD-MM-YYYY or DD/MM/YYYY."
+
+def validate_gender(gender):
+    g = gender.lower()
+    if g in GENDER_MAP:
+        return True, ""
+    return False, "Gender must be Male or Female (M/F accepted)."
+
+def validate_nationality(nationality):
+    if nationality in VALID_COUNTRIES:
+        return True, ""
+    return False, f"Nationality '{nationality}' is not recognized."
+
+def validate_national_id(national_id):
+    if NATIONAL_ID_PATTERN.fullmatch(national_id):
+        return True, ""
+    return False, "National ID must be exactly 14 digits."
+
+def validate_mobile_number(mobile):
+    if MOBILE_PATTERN.match(mobile):
+        return True, ""
+    return False, "Mobile number should be 10 to 15 digits (with optional +)."
+
+def validate_email(email):
+    if EMAIL_PATTERN.match(email):
+        return True, ""
+    return False, "Email address not valid."
+
+def validate_graduation_year(year):
+    if YEAR_PATTERN.fullmatch(year):
+        y = int(year)
+        if 1900 <= y <= 2100:
+            return True, ""
+    return False, "Graduation year must be between 1900 and 2100."
+
+def validate_gpa(gpa):
+    try:
+        val = float(gpa)
+        if 0.0 <= val <= 4.0:
+            return True, ""
+    except:
+        pass
+    return False, "GPA must be 0.0 to 4.0."
+
+def validate_preferred_major(major):
+    if major in VALID_MAJORS:
+        return True, ""
+    return False, f"Preferred Major not recognized."
+
+#################
+# Field registry
+#################
+# Validators are referenced directly, so data_fields is the lookup table used on every turn
+data_fields_list = [
+    ("Student Full Name", validate_full_name),
+    ("Date of Birth", validate_date_of_birth),
+    ("Gender", validate_gender),
+    ("Nationality", validate_nationality),
+    ("National ID", validate_national_id),
+    ("Mobile Number", validate_mobile_number),
+    ("Email Address", validate_email),
+    ("Parent/Guardian Name", validate_full_name),
+    ("Parent/Guardian Contact Number", validate_mobile_number),
+    ("Parent/Guardian Email Address", validate_email),
+    ("High School Name", validate_any),
+    ("Graduation Year", validate_graduation_year),
+    ("GPA", validate_gpa),
+    ("Preferred Major/Program", validate_preferred_major)
+]
+
+# Make a dict for easy lookup
+data_fields = {f[0]: f[1] for f in data_fields_list}
+
+# Every way a field can be referred to in free text
+FIELD_MENTIONS = {**{name.lower(): name for name in data_fields}, **FIELD_NAME_MAPPING}
+# Longest terms first so "parent email" wins over "email"
+FIELD_MENTION_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(term) for term in sorted(FIELD_MENTIONS, key=len, reverse=True)) + r")\b"
+)
+
+def mentioned_fields(text):
+    # Canonical names of the fields referred to in `text`, in order of appearance
+    found = []
+    for term in FIELD_MENTION_PATTERN.findall(text.lower()):
+        field_name = FIELD_MENTIONS[term]
+        if field_name not in found:
+            found.append(field_name)
+    return found
+
+##############
+# Cleaning
+##############
+def map_gender(g):
+    return GENDER_MAP.get(g.lower(), g)
+
+# Built once so typos like "egyption" or "computr science" resolve locally
+# instead of failing validation and costing another turn
+NATIONALITY_INDEX = FuzzyIndex(
+    {alias: country for country, variations in VALID_COUNTRIES.items() for alias in [country, *variations]},
+    threshold=FUZZY_MATCH_THRESHOLD,
+)
+PREFERRED_MAJOR_INDEX = FuzzyIndex(
+    {**{major: major for major in PREFERRED_MAJOR_MAP.values()}, **PREFERRED_MAJOR_MAP},
+    threshold=FUZZY_MATCH_THRESHOLD,
+)
+
+def map_nationality_to_country(nat):
+    country, _ = NATIONALITY_INDEX.lookup(nat)
+    return country or nat.capitalize()
+
+def map_preferred_major(m):
+    major, _ = PREFERRED_MAJOR_INDEX.lookup(m)
+    return major or m.title()
+
+def clean_field(field_name, value):
+    if field_name == "Gender":
+        return map_gender(value)
+    if field_name == "Nationality":
+        return map_nationality_to_country(value)
+    if field_name == "Preferred Major/Program":
+        return map_preferred_major(value)
+    if field_name == "National ID":
+        digits = DIGITS_PATTERN.findall(value)
+        return digits[0] if digits else value
+    return value
@@ -0,0 +1,92 @@
+# registration_reports.py
+#
+# Read side of the registrations collection for the admin dashboard: a
+# streaming export (NDJSON or CSV) that holds one cursor batch in memory at a
+# time, and aggregate counts computed by MongoDB rather than in Python.
+
+import csv
+import io
+import json
+import threading
+import time
+
+from registration_fields import data_fields_list
+
+EXPORT_FORMATS = ("ndjson", "csv")
+DEFAULT_EXPORT_FIELDS = [name for name, _ in data_fields_list] + ["session_id", "source"]
+
+# Stat name -> document field grouped on
+STATS_GROUPS = {
+    "by_major": "Preferred Major/Program",
+    "by_nationality": "Nationality",
+    "by_graduation_year": "Graduation Year",
+}
+
+
+def iter_export(collection, fmt, fields, batch_size=500):
+    # Yields response chunks of up to `batch_size` records each
+    projection = {field: 1 for field in fields}
+    projection["_id"] = 0
+    cursor = collection.find({}, projection).sort("_id", 1).batch_size(batch_size)
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+    count = 0
+    for document in cursor:
+        if fmt == "csv":
+            writer.writerow(document)
+        else:
+            buffer.write(json.dumps(document, default=str) + "\n")
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stats_pipeline():
+    # One round trip: every breakdown is a $facet branch over the same scan
+    facets = {
+        name: [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ]
+        for name, field in STATS_GROUPS.items()
+    }
+    facets["total"] = [{"$count": "count"}]
+    return [{"$facet": facets}]
+
+
+def registration_stats(collection):
+    result = next(iter(collection.aggregate(stats_pipeline())), {})
+    total = result.get("total") or [{"count": 0}]
+    stats = {"total": total[0]["count"]}
+    for name in STATS_GROUPS:
+        # Registrations missing the field are grouped under None, reported as "unknown"
+        stats[name] = {
+            str(row["_id"]) if row["_id"] is not None else "unknown": row["count"]
+            for row in result.get(name, [])
+        }
+    return stats
+
+
+class CachedValue:
+    # Recomputes `fn()` at most once per `ttl_seconds`; concurrent callers
+    # during a refresh wait for it instead of each running the aggregation
+    def __init__(self, fn, ttl_seconds):
+        self.fn = fn
+        self.ttl_seconds = ttl_seconds
+        self.value = None
+        self.computed_at = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            now = time.time()
+            if self.computed_at is None or now - self.computed_at >= self.ttl_seconds:
+                self.value = self.fn()
+                self.computed_at = now
+            return self.value, now - self.computed_at
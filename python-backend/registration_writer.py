@@ -0,0 +1,173 @@
+# registration_writer.py
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+
+
+def ensure_indexes(collection):
+    # Finalization upserts by session_id and admins look students up by National ID.
+    # Bulk-imported registrations have no session_id, hence sparse.
+    try:
+        collection.create_index([("session_id", ASCENDING)], name="session_id_1", unique=True, sparse=True)
+        collection.create_index([("National ID", ASCENDING)], name="national_id_1")
+        logging.info(f"Ensured indexes on {collection.name}.")
+    except PyMongoError as e:
+        logging.error(f"Error creating indexes on {collection.name}: {e}")
+
+
+class RegistrationWriter:
+    # Write-behind queue for finalized registrations. Records are batched into
+    # bulk upserts on a background thread; batches that still fail after the
+    # retries are appended to a local spill file and replayed later, so a slow
+    # or unavailable Mongo never blocks the user's request or loses data.
+    def __init__(self, collection, spill_path, batch_size=100, flush_interval=0.5,
+                 max_retries=3, retry_backoff=0.5, max_queue=10000, replay_interval=30):
+        self.collection = collection
+        self.spill_path = spill_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.replay_interval = replay_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.spill_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.last_replay = 0.0
+        self.stats = {"written": 0, "batches": 0, "retries": 0, "spilled": 0, "replayed": 0, "malformed": 0}
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="registration-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, session_id, data):
+        record = (session_id, dict(data))
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logging.warning(f"Registration write queue full; spilling session {session_id} to disk.")
+            self._spill([record])
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def close(self, timeout=5.0):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        # Anything the thread could not write in time survives in the spill file
+        leftover = self._drain(self.queue.qsize())
+        if leftover:
+            self._spill(leftover)
+
+    def _run(self):
+        # Nothing may escape this loop: a dead thread would leave finalized
+        # registrations sitting in the queue while users are told they were saved
+        try:
+            self._replay_spill()
+        except Exception as e:
+            logging.error(f"Registration writer spill replay failed: {e}")
+        while not (self.stopping.is_set() and self.queue.empty()):
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first] + self._drain(self.batch_size - 1)
+            try:
+                if self._write_batch(batch) and time.time() - self.last_replay > self.replay_interval:
+                    self._replay_spill()
+            except Exception as e:
+                logging.error(f"Registration writer error: {e}")
+
+    def _drain(self, limit):
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _write_batch(self, batch):
+        # The latest state of a session wins if it was finalized twice in one batch
+        latest = {session_id: data for session_id, data in batch}
+        operations = [
+            UpdateOne({"session_id": session_id}, {"$set": data}, upsert=True)
+            for session_id, data in latest.items()
+        ]
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.collection.bulk_write(operations, ordered=False)
+                self.stats["written"] += len(operations)
+                self.stats["batches"] += 1
+                logging.info(f"Saved {len(operations)} registrations in one bulk write.")
+                return True
+            except Exception as e:
+                if attempt == self.max_retries or not isinstance(e, PyMongoError):
+                    logging.error(f"Bulk write of {len(operations)} registrations failed: {e}")
+                    break
+                self.stats["retries"] += 1
+                delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logging.warning(f"Bulk write failed (attempt {attempt + 1}), retrying in {delay:.2f}s: {e}")
+                if self.stopping.wait(delay):
+                    break
+        self._spill(list(latest.items()))
+        return False
+
+    def _spill(self, records):
+        with self.spill_lock:
+            try:
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    for session_id, data in records:
+                        f.write(json.dumps({"session_id": session_id, "data": data}) + "\n")
+                self.stats["spilled"] += len(records)
+            except OSError as e:
+                logging.error(f"Error spilling {len(records)} registrations to {self.spill_path}: {e}")
+
+    def _keep_malformed(self, line):
+        try:
+            with open(f"{self.spill_path}.malformed", "a", encoding="utf-8") as f:
+                f.write(line if line.endswith("\n") else line + "\n")
+        except OSError as e:
+            logging.error(f"Error saving malformed spill line: {e}")
+
+    def _replay_spill(self):
+        self.last_replay = time.time()
+        replay_path = f"{self.spill_path}.replay"
+        with self.spill_lock:
+            # A leftover replay file means the process died mid-replay; upserts are idempotent
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replay_path)
+        records = []
+        with open(replay_path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    records.append((entry["session_id"], entry["data"]))
+                except (ValueError, KeyError, TypeError) as e:
+                    # Typically a line truncated by a crash mid-append; kept aside for inspection
+                    self.stats["malformed"] += 1
+                    logging.error(f"Skipping malformed line {number} in {replay_path}: {e}")
+                    self._keep_malformed(line)
+        logging.info(f"Replaying {len(records)} spilled registrations from {self.spill_path}.")
+        self.stats["replayed"] += len(records)
+        for start in range(0, len(records), self.batch_size):
+            # Failed batches go straight back to the spill file
+            if not self._write_batch(records[start:start + self.batch_size]):
+                remaining = records[start + self.batch_size:]
+                if remaining:
+                    self._spill(remaining)
+                break
+        os.remove(replay_path)
@@ -0,0 +1,137 @@
+# retrieval.py
+
+import bisect
+import math
+import re
+from collections import Counter
+
+#############################
+# Chunking & Tokenization
+#############################
+# Letters and digits in any script, so Arabic questions are indexed too
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in is it its
+me my of on or our so than that the their there these this to was we what
+when where which who why will with you your
+""".split())
+
+
+# Query terms at least this long also match longer indexed words they start ("dorm" -> "dormitory")
+MIN_PREFIX_LENGTH = 4
+
+
+def stem(token):
+    # Light plural folding so "dormitories"/"dormitory" and "fees"/"fee" share a term
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [stem(t) for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text, chunk_size=200, chunk_overlap=40):
+    # Pack whole paragraphs into chunks of roughly `chunk_size` words. The last
+    # paragraphs of a chunk (up to `chunk_overlap` words) are repeated at the
+    # start of the next one so answers spanning a boundary are not lost.
+    paragraphs = []
+    for para in text.split("\n"):
+        words = para.split()
+        # Very long paragraphs are split so a single one never exceeds a chunk
+        for start in range(0, len(words), chunk_size):
+            paragraphs.append(" ".join(words[start:start + chunk_size]))
+
+    chunks = []
+    current, current_words = [], 0
+    for para in paragraphs:
+        para_words = len(para.split())
+        if current and current_words + para_words > chunk_size:
+            chunks.append("\n".join(current))
+            overlap, overlap_words = [], 0
+            for prev in reversed(current):
+                prev_words = len(prev.split())
+                if overlap_words + prev_words > chunk_overlap:
+                    break
+                overlap.insert(0, prev)
+                overlap_words += prev_words
+            current, current_words = overlap, overlap_words
+        current.append(para)
+        current_words += para_words
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+#############################
+# BM25 Index
+#############################
+class BM25Index:
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = []
+        # term -> list of (chunk_index, term_frequency)
+        self.postings = {}
+        for i, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            self.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((i, tf))
+        n = len(chunks)
+        self.avg_length = (sum(self.doc_lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+        self.vocabulary = sorted(self.postings)
+
+    @classmethod
+    def from_text(cls, text, chunk_size=200, chunk_overlap=40):
+        return cls(chunk_text(text, chunk_size, chunk_overlap))
+
+    def expand(self, term):
+        # Indexed terms a query term stands for: itself, or the words it is a prefix of
+        if term in self.idf:
+            return [term]
+        if len(term) < MIN_PREFIX_LENGTH:
+            return []
+        start = bisect.bisect_left(self.vocabulary, term)
+        matches = []
+        for candidate in self.vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, query, k=4):
+        # Returns the top `k` (chunk_index, score) pairs and the share of query
+        # terms that matched anything in the index
+        terms = set(tokenize(query))
+        scores = {}
+        matched = 0
+        for term in terms:
+            expanded = self.expand(term)
+            if expanded:
+                matched += 1
+            for indexed in expanded:
+                idf = self.idf[indexed]
+                for i, tf in self.postings[indexed]:
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / self.avg_length)
+                    scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        hits = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return hits, (matched / len(terms) if terms else 0.0)
+
+    def build_context(self, query, k=4, min_coverage=0.5):
+        # None when retrieval has too little to go on (no hits, or under
+        # `min_coverage` of the query terms found); the caller then sends the
+        # whole document rather than an empty or off-topic excerpt
+        hits, coverage = self.search(query, k)
+        if not hits or coverage < min_coverage:
+            return None
+        # Keep the selected chunks in document order so the prompt reads naturally
+        return "\n...\n".join(self.chunks[i] for i, _ in sorted(hits))
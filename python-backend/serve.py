@@ -0,0 +1,41 @@
+# serve.py
+#
+# Production entry point for the chatbot API. The Flask app is served on gevent:
+# the socket layer is patched so the blocking LLMChain.run (Azure OpenAI over
+# HTTP) and pymongo calls yield to other requests while they wait, and a single
+# process can hold hundreds of in-flight /chat conversations. The /chat
+# contract is unchanged.
+#
+# The LLM dispatcher defaults in main.py (8 concurrent calls, 64 queued) suit a
+# threaded server; with gevent they would answer 503 at about 72 in-flight turns.
+# Unless set explicitly, LLM_MAX_CONCURRENCY defaults to 32 here and LLM_MAX_QUEUE
+# to MAX_CONNECTIONS, so waiting greenlets queue instead of being turned away.
+#
+#   python serve.py
+#   gunicorn -k gevent --worker-connections 1000 -b 0.0.0.0:8000 serve:app
+
+from gevent import monkey
+
+# Must run before anything imports socket, ssl or threading
+monkey.patch_all()
+
+import logging
+import os
+
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Upper bound on concurrently handled requests; further connections wait in the accept backlog
+MAX_CONNECTIONS = int(os.getenv("MAX_CONNECTIONS", "1000"))
+
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "32")
+os.environ.setdefault("LLM_MAX_QUEUE", str(MAX_CONNECTIONS))
+
+from main import app  # Reads the LLM_* settings above at import
+
+if __name__ == "__main__":
+    server = WSGIServer((HOST, PORT), app, spawn=Pool(MAX_CONNECTIONS))
+    logging.info(f"Serving on {HOST}:{PORT} with up to {MAX_CONNECTIONS} concurrent requests.")
+    server.serve_forever()
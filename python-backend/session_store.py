@@ -0,0 +1,184 @@
+# session_store.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class RegistrationSession:
+    __slots__ = (
+        "session_id",
+        "current_field_index",
+        "data",
+        "completed",
+        "editing_field",  # Track if user is currently editing a field
+        "awaiting_finalization",  # Track if awaiting user to finalize or edit
+        "last_seen",
+    )
+
+    def __init__(self, session_id, current_field_index=0, data=None, completed=False,
+                 editing_field=None, awaiting_finalization=False, last_seen=None):
+        self.session_id = session_id
+        self.current_field_index = current_field_index
+        self.data = data if data is not None else {}
+        self.completed = completed
+        self.editing_field = editing_field
+        self.awaiting_finalization = awaiting_finalization
+        self.last_seen = last_seen if last_seen is not None else time.time()
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+
+class MemorySessionStore:
+    # Per-process LRU with idle TTL; sessions are live objects so save() only
+    # refreshes recency.
+    def __init__(self, max_sessions=10000, ttl_seconds=3600):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.sessions = OrderedDict()
+        self.evicted_expired = 0
+        self.evicted_capacity = 0
+        self.lock = threading.Lock()
+
+    def get(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session.last_seen > self.ttl_seconds:
+                del self.sessions[session_id]
+                self.evicted_expired += 1
+                return None
+            self.sessions.move_to_end(session_id)
+            return session
+
+    def create(self, session_id):
+        session = RegistrationSession(session_id)
+        with self.lock:
+            self.sessions[session_id] = session
+            self._evict()
+        return session
+
+    def save(self, session):
+        session.last_seen = time.time()
+        with self.lock:
+            if session.session_id in self.sessions:
+                self.sessions.move_to_end(session.session_id)
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl_seconds
+        # Oldest entries sit at the front, so expired ones are found first
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if oldest.last_seen >= cutoff:
+                break
+            del self.sessions[oldest.session_id]
+            self.evicted_expired += 1
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.evicted_capacity += 1
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "live_sessions": len(self.sessions),
+                "evicted_expired": self.evicted_expired,
+                "evicted_capacity": self.evicted_capacity,
+            }
+
+
+class SQLiteSessionStore:
+    # Shared by every worker process on the host, so any worker can serve any
+    # session_id. Eviction counts are per process.
+    def __init__(self, path="sessions.db", max_sessions=10000, ttl_seconds=3600):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.evicted_expired = 0
+        self.evicted_capacity = 0
+        self.local = threading.local()
+        # The bootstrap connection is closed so a forked worker never inherits it
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS sessions ("
+                    "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, last_seen REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+        finally:
+            conn.close()
+
+    def _connection(self):
+        # One connection per thread and process; SQLite connections must not cross a fork
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT state FROM sessions WHERE session_id = ? AND last_seen >= ?",
+            (session_id, time.time() - self.ttl_seconds),
+        ).fetchone()
+        return RegistrationSession.from_dict(json.loads(row[0])) if row else None
+
+    def create(self, session_id):
+        session = RegistrationSession(session_id)
+        self.save(session)
+        self._evict()
+        return session
+
+    def save(self, session):
+        session.last_seen = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, last_seen) VALUES (?, ?, ?)",
+                (session.session_id, json.dumps(session.to_dict()), session.last_seen),
+            )
+
+    def _evict(self):
+        with self._connection() as conn:
+            expired = conn.execute(
+                "DELETE FROM sessions WHERE last_seen < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            overflow = conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            ).rowcount
+        self.evicted_expired += expired
+        self.evicted_capacity += overflow
+        if expired or overflow:
+            logging.info(f"Evicted {expired} expired and {overflow} overflow registration sessions.")
+
+    def metrics(self):
+        live = self._connection().execute(
+            "SELECT COUNT(*) FROM sessions WHERE last_seen >= ?", (time.time() - self.ttl_seconds,)
+        ).fetchone()[0]
+        return {
+            "live_sessions": live,
+            "evicted_expired": self.evicted_expired,
+            "evicted_capacity": self.evicted_capacity,
+        }
+
+
+def create_session_store(backend, max_sessions, ttl_seconds, sqlite_path):
+    if backend == "sqlite":
+        return SQLiteSessionStore(sqlite_path, max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+    if backend != "memory":
+        logging.warning(f"Unknown session store '{backend}', using memory.")
+    return MemorySessionStore(max_sessions=max_sessions, ttl_seconds=ttl_seconds)
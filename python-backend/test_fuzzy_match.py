@@ -0,0 +1,44 @@
+# test_fuzzy_match.py
+
+import pytest
+
+from fuzzy_match import edit_distance
+from registration_fields import map_nationality_to_country, map_preferred_major, validate_preferred_major
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("computr science", "Computer Science"),
+    ("compter sceince", "Computer Science"),
+    ("mechanical enginering", "Mechanical Engineering"),
+    ("civl engineering", "Civil Engineering"),
+    ("Data  Science", "Data Science"),
+])
+def test_misspelled_majors_resolve(value, expected):
+    assert map_preferred_major(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    "chemical engineering",
+    "electronics engineering",
+    "petroleum engineering",
+    "industrial engineering",
+    "political science",
+])
+def test_different_majors_are_not_rewritten(value):
+    major = map_preferred_major(value)
+    assert major == value.title()
+    assert validate_preferred_major(major) == (False, "Preferred Major not recognized.")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("egyption", "Egypt"),
+    ("Egyptian", "Egypt"),
+    ("canadain", "Canada"),
+])
+def test_misspelled_nationalities_resolve(value, expected):
+    assert map_nationality_to_country(value) == expected
+
+
+def test_edit_distance_counts_transposition_once():
+    assert edit_distance("sceince", "science") == 1
+    assert edit_distance("chemical", "mechanical") >= 3